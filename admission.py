@@ -0,0 +1,156 @@
+import os
+import re
+import shutil
+import threading
+
+from config import (ADMISSION_MEMORY_HEADROOM, ADMISSION_DISK_RESERVE, ADMISSION_MAX_LOAD_PER_CPU,
+                    ADMISSION_POLL_INTERVAL, ADMISSION_DECODE_FRAMES, ADMISSION_ENCODE_FRAMES,
+                    ADMISSION_PROCESS_OVERHEAD, AUTO_BITRATE_RANGE, DEFAULT_BACKEND)
+from ffmpeg_backend import probe_video, get_output_duration
+
+# Used when the source can't be probed
+FALLBACK_SOURCE = {'size': (1920, 1080), 'duration': 600.0, 'bitrate': None}
+AUDIO_BITRATE = 320 * 1000  # bits per second, upper bound for MoviePy's default audio codecs
+
+def parse_bitrate(bitrate):
+    """Return a bitrate string like '1500k' in bits per second"""
+    match = re.match(r'^(\d+)([kM]?)$', str(bitrate))
+    if not match:
+        return None
+    return int(match.group(1)) * {'': 1, 'k': 1000, 'M': 1000000}[match.group(2)]
+
+def get_available_memory():
+    """Return available RAM in bytes, or None if it can't be determined"""
+    try:
+        import psutil
+        return psutil.virtual_memory().available
+    except ImportError:
+        pass
+    try:
+        with open('/proc/meminfo', 'r') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+def get_load_per_cpu():
+    """Return the 1-minute load average per CPU, or None where unsupported"""
+    try:
+        return os.getloadavg()[0] / (os.cpu_count() or 1)
+    except (AttributeError, OSError):
+        return None
+
+def estimate_job(input_path, settings, info=None):
+    """
+    Estimate peak memory and scratch disk needed to convert one file.
+    info is the result of probe_video; it is probed here if not given.
+    Returns {'memory': bytes, 'disk': bytes}.
+    """
+    if info is None:
+        try:
+            info = probe_video(input_path)
+        except Exception:
+            info = FALLBACK_SOURCE
+
+    source_width, source_height = info.get('size') or FALLBACK_SOURCE['size']
+    output_width, output_height = settings.get('resolution') or (source_width, source_height)
+    duration = get_output_duration(settings, info.get('duration') or FALLBACK_SOURCE['duration'])
+
+    # YUV 4:2:0 frames in the decoder and in the encoder's lookahead
+    memory = (source_width * source_height * 1.5 * ADMISSION_DECODE_FRAMES
+              + output_width * output_height * 1.5 * ADMISSION_ENCODE_FRAMES
+              + ADMISSION_PROCESS_OVERHEAD)
+    if settings.get('backend', DEFAULT_BACKEND) == 'moviepy':
+        # MoviePy holds RGB copies of the source and resized frames in Python
+        memory += (source_width * source_height + output_width * output_height) * 3 * 2
+
+    video_bitrate = parse_bitrate(settings.get('bitrate'))
+    if video_bitrate is None:
+        # 'auto' or unknown: assume the highest bitrate it could pick
+        video_bitrate = AUTO_BITRATE_RANGE[1] * 1000
+    disk = (video_bitrate + AUDIO_BITRATE) / 8 * duration * 1.1
+
+    return {'memory': int(memory), 'disk': int(disk)}
+
+class AdmissionController:
+    """
+    Starts jobs only while their estimated memory and disk needs fit in
+    what is currently free and the CPU isn't saturated. Running jobs'
+    reservations count only until their usage shows up in the live
+    figures, so a job isn't counted twice. A job is always admitted when
+    nothing else is running, so a single oversized job can't stall a batch.
+    """
+
+    def __init__(self, disk_path, memory_headroom=ADMISSION_MEMORY_HEADROOM,
+                 disk_reserve=ADMISSION_DISK_RESERVE, max_load_per_cpu=ADMISSION_MAX_LOAD_PER_CPU,
+                 poll_interval=ADMISSION_POLL_INTERVAL):
+        self.disk_path = disk_path
+        self.memory_headroom = memory_headroom
+        self.disk_reserve = disk_reserve
+        self.max_load_per_cpu = max_load_per_cpu
+        self.poll_interval = poll_interval
+        self.reserved_memory = 0
+        self.reserved_disk = 0
+        self.running = 0
+        # Free memory and disk when the first of the running jobs started
+        self.memory_baseline = None
+        self.disk_baseline = None
+        self.condition = threading.Condition()
+
+    def get_free_disk(self):
+        return shutil.disk_usage(self.disk_path).free
+
+    def get_outstanding(self, reserved, baseline, current):
+        """Return the part of the reservations not yet visible as a drop from the baseline"""
+        if baseline is None or current is None:
+            return reserved
+        return max(0, reserved - max(0, baseline - current))
+
+    def check(self, estimate):
+        """Return None if the job fits right now, otherwise the reason it doesn't"""
+        available_memory = get_available_memory()
+        if available_memory is not None:
+            reserved = self.get_outstanding(self.reserved_memory, self.memory_baseline, available_memory)
+            free_memory = available_memory - reserved - self.memory_headroom
+            if estimate['memory'] > free_memory:
+                return f"needs {estimate['memory'] // 2**20} MB RAM, {max(0, free_memory) // 2**20} MB free"
+
+        current_disk = self.get_free_disk()
+        reserved = self.get_outstanding(self.reserved_disk, self.disk_baseline, current_disk)
+        free_disk = current_disk - reserved - self.disk_reserve
+        if estimate['disk'] > free_disk:
+            return f"needs {estimate['disk'] // 2**20} MB disk, {max(0, free_disk) // 2**20} MB free"
+
+        load = get_load_per_cpu()
+        if load is not None and self.running and load > self.max_load_per_cpu:
+            return f"CPU load {load:.2f} per core"
+        return None
+
+    def admit(self, estimate, log=None):
+        """Block until the job may start, then reserve its resources"""
+        with self.condition:
+            waiting_reason = None
+            while self.running:
+                reason = self.check(estimate)
+                if reason is None:
+                    break
+                if log and reason != waiting_reason:
+                    log(f"Waiting for resources: {reason}")
+                waiting_reason = reason
+                # Woken early when a job finishes; the timeout picks up changes outside this process
+                self.condition.wait(self.poll_interval)
+            if not self.running:
+                self.memory_baseline = get_available_memory()
+                self.disk_baseline = self.get_free_disk()
+            self.running += 1
+            self.reserved_memory += estimate['memory']
+            self.reserved_disk += estimate['disk']
+
+    def release(self, estimate):
+        with self.condition:
+            self.running -= 1
+            self.reserved_memory -= estimate['memory']
+            self.reserved_disk -= estimate['disk']
+            self.condition.notify_all()
@@ -0,0 +1,99 @@
+import subprocess
+import numpy as np
+
+from config import (COMPLEXITY_PROBE_SEGMENTS, COMPLEXITY_PROBE_FRAMES, COMPLEXITY_PROBE_WIDTH,
+                    AUTO_BITRATE_BPP, AUTO_BITRATE_QUALITY, AUTO_BITRATE_RANGE, CODEC_EFFICIENCY)
+from ffmpeg_backend import get_ffmpeg_binary, probe_video, get_output_duration
+from utils import get_trim_range
+
+def read_gray_frames(input_path, start, frame_count, size):
+    """
+    Decode a few low resolution grayscale frames starting at the given time.
+    Raises RuntimeError if ffmpeg fails; a seek past the end returns no frames.
+    """
+    width, height = size
+    cmd = [
+        get_ffmpeg_binary(), '-hide_banner', '-loglevel', 'error',
+        '-ss', f"{start:.3f}", '-i', input_path,
+        '-frames:v', str(frame_count), '-an',
+        '-vf', f"scale={width}:{height},format=gray",
+        '-f', 'rawvideo', 'pipe:1'
+    ]
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        error = result.stderr.decode('utf-8', 'replace').strip()
+        raise RuntimeError(error or f"ffmpeg exited with code {result.returncode}")
+    frames = np.frombuffer(result.stdout, dtype=np.uint8)
+    count = frames.size // (width * height)
+    return frames[:count * width * height].reshape(count, height, width).astype(np.float32)
+
+def probe_complexity(input_path, settings=None, segments=COMPLEXITY_PROBE_SEGMENTS,
+                     frame_count=COMPLEXITY_PROBE_FRAMES, width=COMPLEXITY_PROBE_WIDTH):
+    """
+    Estimate how hard a source is to encode by sampling a few short,
+    low resolution segments from the trim range in settings (if any).
+    Returns a dict with spatial and temporal activity and a combined factor.
+    """
+    settings = settings or {}
+    info = probe_video(input_path)
+    range_start = get_trim_range(settings.get('start'), settings.get('end'), settings.get('duration'))[0]
+    range_length = get_output_duration(settings, info['duration'])
+    source_width, source_height = info['size'] or (width, width * 9 // 16)
+    height = max(2, int(round(width * source_height / source_width / 2)) * 2)
+
+    spatial = []
+    temporal = []
+    error = None
+    for i in range(segments):
+        start = range_start + range_length * (i + 1) / (segments + 1)
+        try:
+            frames = read_gray_frames(input_path, start, frame_count, (width, height))
+        except RuntimeError as e:
+            error = e
+            continue
+        if len(frames) == 0:
+            continue
+        # Mean gradient magnitude approximates detail, mean frame difference approximates motion
+        spatial.append(np.abs(np.diff(frames, axis=2)).mean() + np.abs(np.diff(frames, axis=1)).mean())
+        if len(frames) > 1:
+            temporal.append(np.abs(np.diff(frames, axis=0)).mean())
+
+    if not spatial:
+        # Falling back to a default factor would silently pick the minimum bitrate
+        raise RuntimeError(f"Could not sample frames for complexity analysis: {error or 'no frames decoded'}")
+    spatial_activity = float(np.mean(spatial))
+    temporal_activity = float(np.mean(temporal)) if temporal else 0.0
+    factor = 0.25 + spatial_activity / 40 + temporal_activity / 6
+
+    return {
+        'spatial': spatial_activity,
+        'temporal': temporal_activity,
+        'factor': min(3.0, factor),
+        'size': info['size'],
+        'fps': info['fps']
+    }
+
+def select_bitrate(complexity, resolution=None, fps=None, codec=None, quality=AUTO_BITRATE_QUALITY):
+    """Pick a bitrate string (e.g. '1800k') for the probed complexity and target settings"""
+    width, height = resolution or complexity['size'] or (1280, 720)
+    fps = fps or complexity['fps'] or 30
+    bits_per_pixel = AUTO_BITRATE_BPP[quality] * complexity['factor'] * CODEC_EFFICIENCY.get(codec, 1.0)
+    kbps = bits_per_pixel * width * height * fps / 1000
+    minimum, maximum = AUTO_BITRATE_RANGE
+    return f"{int(max(minimum, min(maximum, kbps)))}k"
+
+def resolve_auto_bitrate(input_path, settings, complexity=None):
+    """
+    Return a copy of settings with an 'auto' bitrate replaced by a probed value.
+    complexity, a result of probe_complexity for the same source, skips the probe.
+    """
+    if settings.get('bitrate') != 'auto':
+        return settings
+    resolved = dict(settings)
+    if complexity is None:
+        complexity = probe_complexity(input_path, settings)
+    resolved['bitrate'] = select_bitrate(
+        complexity, settings.get('resolution'), settings.get('fps'),
+        settings.get('codec'), settings.get('quality', AUTO_BITRATE_QUALITY)
+    )
+    return resolved
@@ -0,0 +1,152 @@
+"""
+asyncio API for embedding conversions in services.
+
+ffmpeg runs as a native asyncio subprocess, so many conversions can be
+supervised from one event loop without threads or Qt:
+
+    converter = AsyncConverter(max_concurrent=4)
+    success, message = await converter.convert("in.mov", "out.mp4", settings)
+
+    async for event in converter.events("in.mov", "out.mp4", settings):
+        print(event)
+
+Output is written to the scratch directory and moved into place once it is
+complete (and verified, if requested). Cancelling the awaiting task kills
+ffmpeg, and any failure or cancellation before the move removes the partial
+output.
+"""
+
+import asyncio
+import os
+
+from config import ASYNC_MAX_CONCURRENT, SCRATCH_DIR, VERIFY_OUTPUT, VERIFY_QUALITY
+from analysis import resolve_auto_bitrate
+from ffmpeg_backend import probe_video, build_ffmpeg_command, parse_progress, get_output_duration
+from utils import get_output_filepath, get_scratch_filepath, atomic_move
+
+class AsyncConverter:
+    def __init__(self, max_concurrent=ASYNC_MAX_CONCURRENT, scratch_dir=SCRATCH_DIR):
+        self.semaphore = asyncio.Semaphore(max_concurrent)
+        self.scratch_dir = scratch_dir
+
+    async def events(self, input_path, output_path, settings):
+        """
+        Convert a video, yielding progress events as dicts:
+        {'type': 'progress', 'percentage': int} while encoding, then
+        {'type': 'complete', 'success': bool, 'message': str}.
+        Errors end in a failed 'complete' event; cancellation propagates.
+        """
+        loop = asyncio.get_running_loop()
+        async with self.semaphore:
+            try:
+                # Probing is a short blocking ffmpeg call; keep it off the loop
+                info = await loop.run_in_executor(None, probe_video, input_path)
+                output_duration = get_output_duration(settings, info['duration'])
+                settings = await loop.run_in_executor(None, resolve_auto_bitrate, input_path, settings)
+
+                scratch_path = get_scratch_filepath(output_path, self.scratch_dir)
+                moved = False
+                try:
+                    cmd = build_ffmpeg_command(input_path, scratch_path, settings)
+                    cmd = cmd[:1] + ['-progress', 'pipe:1', '-nostats'] + cmd[1:]
+                    try:
+                        process = await asyncio.create_subprocess_exec(
+                            *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+                        )
+                    except OSError as e:
+                        raise RuntimeError(f"Could not start ffmpeg: {e}")
+
+                    stderr_task = asyncio.ensure_future(process.stderr.read())
+                    try:
+                        last_percentage = -1
+                        async for line in process.stdout:
+                            percentage = parse_progress(line.decode('utf-8', 'replace'), output_duration)
+                            if percentage is not None and percentage != last_percentage:
+                                last_percentage = percentage
+                                yield {'type': 'progress', 'percentage': percentage}
+                        await process.wait()
+                        stderr = (await stderr_task).decode('utf-8', 'replace').strip()
+                    except BaseException:
+                        # Cancelled (or the consumer went away): stop ffmpeg; the
+                        # partial file is removed below
+                        if process.returncode is None:
+                            process.kill()
+                            await process.wait()
+                        stderr_task.cancel()
+                        raise
+                    if process.returncode != 0:
+                        raise RuntimeError(stderr or f"ffmpeg exited with code {process.returncode}")
+
+                    if settings.get('verify', VERIFY_OUTPUT):
+                        from verify import verify_output
+
+                        verified, verify_message, _ = await loop.run_in_executor(
+                            None, verify_output, input_path, scratch_path, dict(settings, backend='native'),
+                            settings.get('verify_quality', VERIFY_QUALITY)
+                        )
+                        if not verified:
+                            raise RuntimeError(f"Verification failed: {verify_message}")
+
+                    # A cross-filesystem move copies the file; don't hold up the loop
+                    move = loop.run_in_executor(None, atomic_move, scratch_path, output_path)
+                    try:
+                        await asyncio.shield(move)
+                    finally:
+                        # If cancelled, let the copy finish in its thread instead
+                        # of removing the scratch file from under it
+                        await asyncio.wait([move])
+                        moved = move.exception() is None
+                finally:
+                    if not moved and os.path.exists(scratch_path):
+                        os.remove(scratch_path)
+            except Exception as e:
+                # Report rather than raise, so one bad file doesn't abort a batch
+                yield {'type': 'complete', 'success': False, 'message': f"Conversion failed: {e}"}
+                return
+
+        yield {'type': 'complete', 'success': True, 'message': "Conversion successful!"}
+
+    async def convert(self, input_path, output_path, settings, progress_callback=None):
+        """Convert a video and return (success, message)"""
+        events = self.events(input_path, output_path, settings)
+        try:
+            async for event in events:
+                if event['type'] == 'progress':
+                    if progress_callback:
+                        progress_callback(event['percentage'])
+                else:
+                    return event['success'], event['message']
+        finally:
+            await events.aclose()
+
+    async def convert_batch(self, file_list, output_dir, settings, progress_callback=None):
+        """
+        Convert multiple videos concurrently (bounded by max_concurrent).
+        Returns (successful_conversions, failed_conversions) like VideoConverter.convert_batch.
+        """
+        done = 0
+
+        async def convert_one(input_path):
+            nonlocal done
+            output_path = get_output_filepath(input_path, output_dir, settings['format'])
+            result = await self.convert(input_path, output_path, settings)
+            done += 1
+            if progress_callback:
+                progress_callback(int((done / len(file_list)) * 100))
+            return result
+
+        results = await asyncio.gather(*(convert_one(path) for path in file_list))
+        failed_conversions = [
+            (input_path, message)
+            for input_path, (success, message) in zip(file_list, results) if not success
+        ]
+        return len(file_list) - len(failed_conversions), failed_conversions
+
+_default_converter = None
+
+async def convert(input_path, output_path, settings, progress_callback=None):
+    """Convert a video with a shared AsyncConverter and return (success, message)"""
+    global _default_converter
+    if _default_converter is None:
+        _default_converter = AsyncConverter()
+    return await _default_converter.convert(input_path, output_path, settings, progress_callback)
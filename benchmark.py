@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark tooling.
+
+    python benchmark.py imports [--module gui] [--top 20]
+        Import-time report (python -X importtime), slowest modules first.
+    python benchmark.py startup [--runs 5]
+        Time from launch to first window paint, checked against STARTUP_BUDGET_MS.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from config import STARTUP_BUDGET_MS
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def import_times(module):
+    """Return [(cumulative_us, self_us, name)] for everything imported by `import module`"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f"import {module}"],
+        cwd=BASE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        times.append((int(cumulative_us), int(self_us), name.rstrip()))
+    return times
+
+def import_report(module, top=20):
+    times = import_times(module)
+    total = max(cumulative for cumulative, _, _ in times) if times else 0
+    print(f"Import time for '{module}': {total / 1000:.1f} ms ({len(times)} modules)")
+    print(f"{'cumulative ms':>14} {'self ms':>8}  module")
+    for cumulative, self_us, name in sorted(times, reverse=True)[:top]:
+        print(f"{cumulative / 1000:>14.1f} {self_us / 1000:>8.1f}  {name}")
+
+def measure_startup(runs=5):
+    """Launch the app repeatedly and return [(first_paint_ms, wall_ms)]"""
+    env = dict(os.environ, VIDEO_CONVERTER_STARTUP_PROBE='1')
+    if not env.get('DISPLAY') and sys.platform.startswith('linux'):
+        env.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+    results = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, os.path.join(BASE_DIR, 'main.py')],
+            env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            universal_newlines=True, timeout=60
+        )
+        wall_ms = (time.perf_counter() - start) * 1000
+        paint_ms = None
+        for line in result.stdout.splitlines():
+            if line.startswith('startup_ms='):
+                paint_ms = float(line.split('=', 1)[1])
+        if paint_ms is None:
+            raise RuntimeError(result.stderr.strip() or "Application did not report a startup time")
+        results.append((paint_ms, wall_ms))
+    return results
+
+def startup_report(runs=5):
+    results = measure_startup(runs)
+    paint = statistics.median(paint_ms for paint_ms, _ in results)
+    wall = statistics.median(wall_ms for _, wall_ms in results)
+    status = "OK" if paint <= STARTUP_BUDGET_MS else "OVER BUDGET"
+    print(f"First paint: {paint:.0f} ms median over {runs} runs (budget {STARTUP_BUDGET_MS} ms) - {status}")
+    print(f"Process launch to exit: {wall:.0f} ms median")
+    return paint <= STARTUP_BUDGET_MS
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Video converter benchmarks")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    imports_parser = subparsers.add_parser('imports', help="Import-time report")
+    imports_parser.add_argument('--module', default='gui')
+    imports_parser.add_argument('--top', type=int, default=20)
+
+    startup_parser = subparsers.add_parser('startup', help="Time to first window paint")
+    startup_parser.add_argument('--runs', type=int, default=5)
+
+    args = parser.parse_args(argv)
+    if args.command == 'imports':
+        import_report(args.module, args.top)
+        return 0
+    return 0 if startup_report(args.runs) else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
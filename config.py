@@ -1,5 +1,7 @@
 # Configuration settings for the video converter
 
+import os
+
 # Supported video formats
 SUPPORTED_INPUT_FORMATS = ['.mp4', '.avi', '.mkv', '.mov', '.wmv', '.flv', '.webm', '.m4v']
 SUPPORTED_OUTPUT_FORMATS = ['.mp4', '.avi', '.mkv', '.mov', '.wmv', '.flv', '.webm']
@@ -34,6 +36,137 @@ BITRATE_PRESETS = {
     'Medium (1000k)': '1000k',
     'High (2000k)': '2000k',
     'Very High (5000k)': '5000k',
-    'Ultra (10000k)': '10000k'
+    'Ultra (10000k)': '10000k',
+    'Auto (per-title)': 'auto'
+}
+
+# Preview settings
+PREVIEW_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "modern_video_converter", "previews")
+PREVIEW_THUMBNAIL_COUNT = 6
+PREVIEW_THUMBNAIL_WIDTH = 320
+PREVIEW_SAMPLE_SECONDS = 5
+
+# Automatic per-title bitrate ('auto' bitrate)
+COMPLEXITY_PROBE_SEGMENTS = 3
+COMPLEXITY_PROBE_FRAMES = 12
+COMPLEXITY_PROBE_WIDTH = 160
+AUTO_BITRATE_QUALITY = 'medium'
+AUTO_BITRATE_BPP = {
+    'low': 0.03,
+    'medium': 0.05,
+    'high': 0.08
+}
+AUTO_BITRATE_RANGE = (150, 20000)  # kbps
+
+# Relative bitrate needed for the same quality as H.264
+CODEC_EFFICIENCY = {
+    'libx264': 1.0,
+    'libx265': 0.6,
+    'libvpx-vp9': 0.65,
+    'libvpx': 1.1,
+    'mpeg4': 1.5
 }
 
+# Distributed conversion (job broker)
+BROKER_DB_PATH = os.path.join(os.path.expanduser("~"), ".cache", "modern_video_converter", "jobs.sqlite3")
+BROKER_HEARTBEAT_INTERVAL = 10  # seconds
+BROKER_JOB_TIMEOUT = 60  # seconds without a heartbeat before a job is retried
+BROKER_MAX_ATTEMPTS = 3
+BROKER_POLL_INTERVAL = 2  # seconds
+
+# asyncio API
+ASYNC_MAX_CONCURRENT = 2
+
+# Disk I/O
+# In-progress output is written here and moved into the output directory when
+# done. None writes the partial file next to the final output instead.
+SCRATCH_DIR = os.environ.get("VIDEO_CONVERTER_SCRATCH_DIR")
+# Opt-in read-ahead of large sources, a window at a time just ahead of the decoder
+READAHEAD_ENABLED = False
+READAHEAD_MIN_BYTES = 256 * 1024 * 1024
+READAHEAD_WINDOW_BYTES = 64 * 1024 * 1024
+FASTSTART_FORMATS = ['.mp4', '.mov', '.m4v']
+
+# Time from launch to first window paint that we aim to stay under
+STARTUP_BUDGET_MS = 1500
+
+# User presets (*.json / *.toml) loaded alongside the built-in ones
+USER_PRESETS_DIR = os.path.join(os.path.expanduser("~"), ".config", "modern_video_converter", "presets")
+
+# Encoding backend: 'moviepy' decodes frames into Python as RGB, 'native' runs
+# a single ffmpeg process that keeps frames in YUV, 'auto' picks native unless
+# Python-side frame processing is needed
+DEFAULT_BACKEND = 'auto'
+
+# Decoder/encoder threading (0 lets ffmpeg decide)
+DECODER_THREADS = 0
+DECODER_THREAD_TYPE = 'frame+slice'  # 'slice' uses less memory per decoder
+ENCODER_THREADS = 0
+
+# Output pixel format for the native backend: 'auto' uses the container's
+# entry in CONTAINER_PIXEL_FORMATS, None keeps the format ffmpeg negotiates
+# with the encoder (4:2:2, 4:4:4 and 10-bit sources pass through), anything
+# else is passed to -pix_fmt. Presets and settings dicts can override it.
+OUTPUT_PIXEL_FORMAT = 'auto'
+# Containers mostly played in browsers, phones and players that only decode
+# 4:2:0 8-bit; others (.mkv) keep the source format
+CONTAINER_PIXEL_FORMATS = {
+    '.mp4': 'yuv420p',
+    '.mov': 'yuv420p',
+    '.m4v': 'yuv420p',
+    '.webm': 'yuv420p',
+    '.avi': 'yuv420p',
+    '.wmv': 'yuv420p',
+    '.flv': 'yuv420p'
+}
+
+# Retry and fallback policy for batch items
+RETRY_MAX_ATTEMPTS = 4
+RETRY_BACKOFF_SECONDS = 2
+RETRY_BACKOFF_FACTOR = 2
+RETRY_MAX_BACKOFF_SECONDS = 60
+BACKEND_FALLBACKS = {
+    'auto': 'moviepy',
+    'native': 'moviepy'
+}
+CODEC_FALLBACKS = {
+    'libx265': ['libx264'],
+    'libvpx-vp9': ['libvpx', 'libx264'],
+    'libvpx': ['libx264'],
+    'libx264': ['mpeg4']
+}
+# Containers that only accept some codecs; others are assumed to take any
+CONTAINER_CODECS = {
+    '.webm': ['libvpx-vp9', 'libvpx']
+}
+
+# Frame rate options (None keeps the source frame rate)
+FRAME_RATE_PRESETS = {
+    'Original': None,
+    '60 fps': 60,
+    '30 fps': 30,
+    '25 fps': 25,
+    '24 fps': 24,
+    '15 fps': 15
+}
+
+# Parallel batches and admission control
+BATCH_MAX_PARALLEL = 1
+ADMISSION_MEMORY_HEADROOM = 512 * 1024 * 1024  # bytes of RAM always left free
+ADMISSION_DISK_RESERVE = 1024 * 1024 * 1024  # bytes of scratch/output disk always left free
+ADMISSION_MAX_LOAD_PER_CPU = 1.5  # 1-minute load average per CPU above which no new job starts
+ADMISSION_POLL_INTERVAL = 2  # seconds
+# Frames buffered per job by the decoder and by the encoder (lookahead, references)
+ADMISSION_DECODE_FRAMES = 16
+ADMISSION_ENCODE_FRAMES = 60
+ADMISSION_PROCESS_OVERHEAD = 150 * 1024 * 1024  # bytes per encoder process
+
+# Output verification
+VERIFY_OUTPUT = False
+VERIFY_QUALITY = False
+VERIFY_DURATION_TOLERANCE = 0.5  # seconds
+VERIFY_AV_SYNC_TOLERANCE = 0.2  # seconds between audio and video stream lengths
+VERIFY_SAMPLE_FRAMES = 4
+VERIFY_SAMPLE_WIDTH = 320
+VERIFY_MIN_PSNR = 28.0  # dB
+VERIFY_MIN_SSIM = 0.85
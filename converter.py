@@ -1,54 +1,88 @@
-from moviepy.video.io.VideoFileClip import VideoFileClip
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from PyQt5.QtCore import QObject, pyqtSignal
 
+from config import (SCRATCH_DIR, READAHEAD_ENABLED, READAHEAD_MIN_BYTES, READAHEAD_WINDOW_BYTES, FASTSTART_FORMATS,
+                    DEFAULT_BACKEND, BATCH_MAX_PARALLEL, VERIFY_OUTPUT, VERIFY_QUALITY,
+                    DECODER_THREADS, DECODER_THREAD_TYPE, ENCODER_THREADS, OUTPUT_PIXEL_FORMAT,
+                    AUTO_BITRATE_QUALITY)
+from utils import get_file_extension, get_scratch_filepath, atomic_move, get_trim_range, ReadAhead
+from retry import RetryPolicy
+from admission import AdmissionController, estimate_job
+
 class VideoConverter(QObject):
     progress_update = pyqtSignal(str)
     conversion_progress = pyqtSignal(int)  # Progress percentage
     
-    def __init__(self):
+    def __init__(self, scratch_dir=SCRATCH_DIR, retry_policy=None):
         super().__init__()
+        self.scratch_dir = scratch_dir
+        self.retry_policy = retry_policy or RetryPolicy()
 
-    def convert_video(self, input_path, output_path, resolution=None, bitrate=None, codec=None, progress_callback=None):
+    def convert_video(self, input_path, output_path, resolution=None, bitrate=None, codec=None, progress_callback=None,
+                      backend=DEFAULT_BACKEND, start=None, end=None, duration=None, fps=None,
+                      verify=False, verify_quality=False, decoder_threads=DECODER_THREADS,
+                      thread_type=DECODER_THREAD_TYPE, encoder_threads=ENCODER_THREADS,
+                      pixel_format=OUTPUT_PIXEL_FORMAT, quality=AUTO_BITRATE_QUALITY):
+        scratch_path = None
+        reader = None
         try:
-            self.progress_update.emit(f"Loading video: {os.path.basename(input_path)}")
-            clip = VideoFileClip(input_path)
+            trim_start, trim_length = get_trim_range(start, end, duration)
+            
+            if READAHEAD_ENABLED and os.path.getsize(input_path) >= READAHEAD_MIN_BYTES:
+                reader = self.start_readahead(input_path, trim_start, trim_length)
+                report_progress = progress_callback
+                
+                def progress_callback(percentage):
+                    reader.advance(percentage / 100)
+                    if report_progress:
+                        report_progress(percentage)
 
-            if resolution:
-                self.progress_update.emit(f"Resizing to {resolution[0]}x{resolution[1]}")
-                clip = clip.resized(new_size=resolution)
+            if bitrate == 'auto':
+                bitrate = self.resolve_bitrate(input_path, {
+                    'bitrate': bitrate, 'resolution': resolution, 'codec': codec, 'fps': fps,
+                    'start': start, 'end': end, 'duration': duration, 'quality': quality
+                })['bitrate']
+
+            # Encode to scratch space so seeks and the faststart rewrite stay
+            # off the output volume, then move the finished file into place.
+            # The scratch file isn't preallocated: ffmpeg opens its output with
+            # O_TRUNC, which drops any blocks reserved beforehand
+            scratch_path = get_scratch_filepath(output_path, self.scratch_dir)
             
-            # Set output parameters
-            ffmpeg_options = []
-            if bitrate:
-                ffmpeg_options.append(f"-b:v {bitrate}")
-            if codec:
-                ffmpeg_options.append(f"-c:v {codec}")
-
-            self.progress_update.emit(f"Converting to {os.path.basename(output_path)}")
+            # Nothing we do needs frames in Python, so 'auto' lets ffmpeg keep
+            # them in the decoder's pixel format instead of piping RGB through
+            # MoviePy. convert_with_settings falls back to MoviePy if it fails.
+            if backend == 'auto':
+                backend = 'native'
             
-            # Custom progress callback for MoviePy
-            def progress_bar(get_frame, t):
-                if progress_callback:
-                    progress_percentage = int((t / clip.duration) * 100)
-                    progress_callback(progress_percentage)
-                return get_frame(t)
-
-            # Write the video file with progress tracking
-            write_params = {
-                'filename': output_path,
-                'logger': None
-            }
+            if backend == 'native':
+                settings = {'resolution': resolution, 'bitrate': bitrate, 'codec': codec,
+                            'start': start, 'end': end, 'duration': duration, 'fps': fps,
+                            'decoder_threads': decoder_threads, 'thread_type': thread_type,
+                            'encoder_threads': encoder_threads, 'pixel_format': pixel_format}
+                self.encode_with_ffmpeg(input_path, scratch_path, output_path, settings, progress_callback)
+            else:
+                self.encode_with_moviepy(input_path, scratch_path, output_path, resolution, bitrate, codec,
+                                         progress_callback, trim_start, trim_length, fps,
+                                         encoder_threads)
             
-            if codec:
-                write_params['codec'] = codec
-            if bitrate:
-                write_params['bitrate'] = bitrate
-            if ffmpeg_options:
-                write_params['ffmpeg_params'] = ffmpeg_options
+            if verify:
+                # Check the scratch file so a bad encode never reaches the output directory
+                from verify import verify_output
                 
-            clip.write_videofile(**write_params)
-            clip.close()
+                self.progress_update.emit("Verifying output")
+                verify_settings = {'start': start, 'end': end, 'duration': duration, 'fps': fps,
+                                   'backend': backend}
+                verified, verify_message, _ = verify_output(input_path, scratch_path, verify_settings,
+                                                            check_quality=verify_quality)
+                if not verified:
+                    raise RuntimeError(f"Verification failed: {verify_message}")
+                self.progress_update.emit(verify_message)
+            
+            atomic_move(scratch_path, output_path)
+            scratch_path = None
             
             self.progress_update.emit("Conversion completed successfully!")
             return True, "Conversion successful!"
@@ -56,46 +90,229 @@ class VideoConverter(QObject):
         except Exception as e:
             self.progress_update.emit(f"Error: {str(e)}")
             return False, f"Conversion failed: {e}"
+        
+        finally:
+            if reader:
+                reader.close()
+            if scratch_path and os.path.exists(scratch_path):
+                os.remove(scratch_path)
+
+    def start_readahead(self, input_path, trim_start, trim_length):
+        """Start reading ahead from the part of the source the trim range covers"""
+        start_fraction, end_fraction = 0.0, 1.0
+        if trim_start or trim_length is not None:
+            from ffmpeg_backend import probe_video
+            
+            source_duration = probe_video(input_path)['duration']
+            if source_duration:
+                start_fraction = min(1.0, trim_start / source_duration)
+                if trim_length is not None:
+                    end_fraction = min(1.0, (trim_start + trim_length) / source_duration)
+        self.progress_update.emit(f"Reading ahead: {os.path.basename(input_path)}")
+        return ReadAhead(input_path, READAHEAD_WINDOW_BYTES, start_fraction, end_fraction)
+
+    def analyze_complexity(self, input_path, settings):
+        """Probe how hard the (trimmed) source is to encode, for an 'auto' bitrate"""
+        from analysis import probe_complexity
+        
+        self.progress_update.emit(f"Analyzing complexity: {os.path.basename(input_path)}")
+        return probe_complexity(input_path, settings)
 
-    def convert_batch(self, file_list, output_dir, settings, progress_callback=None):
+    def resolve_bitrate(self, input_path, settings, complexity=None):
+        """Return settings with an 'auto' bitrate replaced by one picked for the (trimmed) source"""
+        from analysis import resolve_auto_bitrate
+        
+        if complexity is None:
+            complexity = self.analyze_complexity(input_path, settings)
+        settings = resolve_auto_bitrate(input_path, settings, complexity)
+        self.progress_update.emit(f"Selected bitrate {settings['bitrate']}")
+        return settings
+
+    def encode_with_moviepy(self, input_path, scratch_path, output_path, resolution, bitrate, codec,
+                            progress_callback=None, trim_start=0.0, trim_length=None, fps=None,
+                            encoder_threads=None):
+        # MoviePy is slow to import, so only load it once a conversion starts
+        from moviepy.video.io.VideoFileClip import VideoFileClip
+        
+        self.progress_update.emit(f"Loading video: {os.path.basename(input_path)}")
+        if resolution:
+            # Let MoviePy's ffmpeg reader scale while decoding rather than
+            # resizing full-size RGB frames in Python
+            self.progress_update.emit(f"Resizing to {resolution[0]}x{resolution[1]}")
+        clip = VideoFileClip(input_path, target_resolution=resolution)
+
+        if trim_start or trim_length is not None:
+            # MoviePy's reader starts ffmpeg with an input-side seek, so frames
+            # before the trim start are not decoded
+            trim_end = trim_start + trim_length if trim_length is not None else None
+            self.progress_update.emit(f"Trimming to {trim_start:.2f}s - {trim_end if trim_end is not None else 'end'}")
+            clip = clip.subclipped(trim_start, trim_end)
+
+        self.progress_update.emit(f"Converting to {os.path.basename(output_path)}")
+        
+        # Custom progress callback for MoviePy
+        def progress_bar(get_frame, t):
+            if progress_callback:
+                progress_percentage = int((t / clip.duration) * 100)
+                progress_callback(progress_percentage)
+            return get_frame(t)
+        
+        clip = clip.transform(progress_bar)
+
+        write_params = {
+            'filename': scratch_path,
+            'temp_audiofile_path': os.path.dirname(scratch_path),
+            'logger': None
+        }
+        
+        if codec:
+            write_params['codec'] = codec
+        if bitrate:
+            write_params['bitrate'] = bitrate
+        if fps:
+            write_params['fps'] = fps
+        if encoder_threads:
+            write_params['threads'] = encoder_threads
+        if get_file_extension(output_path) in FASTSTART_FORMATS:
+            write_params['ffmpeg_params'] = ['-movflags', '+faststart']
+            
+        clip.write_videofile(**write_params)
+        clip.close()
+
+    def encode_with_ffmpeg(self, input_path, scratch_path, output_path, settings, progress_callback=None):
+        """Encode with a single ffmpeg process, without decoding frames into Python"""
+        from ffmpeg_backend import probe_video, build_ffmpeg_command, run_ffmpeg, get_output_duration
+        
+        self.progress_update.emit(f"Converting to {os.path.basename(output_path)} (native ffmpeg)")
+        duration = get_output_duration(settings, probe_video(input_path)['duration'])
+        cmd = build_ffmpeg_command(input_path, scratch_path, settings)
+        success, message = run_ffmpeg(cmd, duration=duration, progress_callback=progress_callback)
+        if not success:
+            raise RuntimeError(message)
+
+    def convert_once(self, input_path, output_path, settings, progress_callback=None):
+        """Make a single conversion attempt with a settings dict, without retries or fallbacks"""
+        return self.convert_video(
+            input_path, output_path,
+            settings.get('resolution'),
+            settings.get('bitrate'),
+            settings.get('codec'),
+            progress_callback=progress_callback,
+            backend=settings.get('backend', DEFAULT_BACKEND),
+            start=settings.get('start'),
+            end=settings.get('end'),
+            duration=settings.get('duration'),
+            fps=settings.get('fps'),
+            verify=settings.get('verify', VERIFY_OUTPUT),
+            verify_quality=settings.get('verify_quality', VERIFY_QUALITY),
+            decoder_threads=settings.get('decoder_threads', DECODER_THREADS),
+            thread_type=settings.get('thread_type', DECODER_THREAD_TYPE),
+            encoder_threads=settings.get('encoder_threads', ENCODER_THREADS),
+            pixel_format=settings.get('pixel_format', OUTPUT_PIXEL_FORMAT),
+            quality=settings.get('quality', AUTO_BITRATE_QUALITY)
+        )
+
+    def run_with_retries(self, input_path, output_path, settings, progress_callback=None):
+        """
+        Convert, retrying or falling back per the retry policy.
+        Returns (success, message, category, changes), where changes holds
+        the settings a fallback replaced.
+        """
+        complexity = None
+        if settings.get('bitrate') == 'auto':
+            # Probe once rather than on every attempt
+            try:
+                complexity = self.analyze_complexity(input_path, settings)
+            except Exception:
+                # Leave it to the first attempt, which probes again and reports the error
+                pass
+        
+        def attempt(attempt_settings):
+            if complexity is not None:
+                # Picked per attempt, since the right bitrate depends on the (fallback) codec
+                attempt_settings = self.resolve_bitrate(input_path, attempt_settings, complexity)
+            return self.convert_once(input_path, output_path, attempt_settings, progress_callback)
+        
+        success, message, category, used_settings = self.retry_policy.run(
+            attempt, settings, log=self.progress_update.emit
+        )
+        changes = {key: value for key, value in used_settings.items() if settings.get(key) != value}
+        return success, message, category, changes
+
+    def convert_with_settings(self, input_path, output_path, settings, progress_callback=None):
+        """Convert a single video using a settings dict as returned by get_conversion_settings"""
+        success, message, category, changes = self.run_with_retries(
+            input_path, output_path, settings, progress_callback
+        )
+        if success and changes:
+            message += f" (fallback: {changes})"
+        elif category:
+            message = f"[{category}] {message}"
+        return success, message
+
+    def convert_batch(self, file_list, output_dir, settings, progress_callback=None, max_parallel=BATCH_MAX_PARALLEL):
         """
-        Convert multiple videos with the same settings
+        Convert multiple videos with the same settings.
+        With max_parallel > 1, files are converted concurrently as long as
+        the admission controller finds enough memory, disk and CPU for them.
         """
         total_files = len(file_list)
         successful_conversions = 0
         failed_conversions = []
+        finished = 0
+        lock = threading.Lock()
+        admission = AdmissionController(self.scratch_dir or output_dir) if max_parallel > 1 else None
         
-        for i, input_path in enumerate(file_list):
+        def convert_one(i, input_path):
+            nonlocal successful_conversions, finished
+            estimate = None
             try:
                 # Generate output path
                 filename = os.path.splitext(os.path.basename(input_path))[0]
                 output_path = os.path.join(output_dir, f"{filename}{settings['format']}")
                 
+                if admission:
+                    estimate = estimate_job(input_path, settings)
+                    admission.admit(estimate, log=self.progress_update.emit)
+                
                 self.progress_update.emit(f"Processing {i+1}/{total_files}: {os.path.basename(input_path)}")
                 
-                # Convert individual video
-                success, message = self.convert_video(
-                    input_path, output_path,
-                    settings.get('resolution'),
-                    settings.get('bitrate'),
-                    settings.get('codec')
-                )
+                # Convert individual video, retrying or falling back per the retry policy
+                success, message, category, changes = self.run_with_retries(input_path, output_path, settings)
                 
-                if success:
-                    successful_conversions += 1
-                    self.progress_update.emit(f"✓ Completed: {os.path.basename(input_path)}")
-                else:
-                    failed_conversions.append((input_path, message))
-                    self.progress_update.emit(f"✗ Failed: {os.path.basename(input_path)} - {message}")
+                with lock:
+                    if success:
+                        successful_conversions += 1
+                        note = f" (fallback: {changes})" if changes else ""
+                        self.progress_update.emit(f"✓ Completed: {os.path.basename(input_path)}{note}")
+                    else:
+                        message = f"[{category}] {message}"
+                        failed_conversions.append((input_path, message))
+                        self.progress_update.emit(f"✗ Failed: {os.path.basename(input_path)} - {message}")
+                    
+            except Exception as e:
+                with lock:
+                    failed_conversions.append((input_path, str(e)))
+                self.progress_update.emit(f"✗ Error processing {os.path.basename(input_path)}: {str(e)}")
+            
+            finally:
+                if estimate is not None:
+                    admission.release(estimate)
                 
                 # Update overall progress
+                with lock:
+                    finished += 1
+                    overall_progress = int((finished / total_files) * 100)
                 if progress_callback:
-                    overall_progress = int(((i + 1) / total_files) * 100)
                     progress_callback(overall_progress)
-                    
-            except Exception as e:
-                failed_conversions.append((input_path, str(e)))
-                self.progress_update.emit(f"✗ Error processing {os.path.basename(input_path)}: {str(e)}")
+        
+        if admission:
+            with ThreadPoolExecutor(max_workers=max_parallel) as executor:
+                for i, input_path in enumerate(file_list):
+                    executor.submit(convert_one, i, input_path)
+        else:
+            for i, input_path in enumerate(file_list):
+                convert_one(i, input_path)
         
         # Summary
         summary = f"Batch conversion completed: {successful_conversions}/{total_files} successful"
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Distributed conversion through a shared SQLite job spool.
+
+A coordinator submits convert_video jobs to the spool and any number of
+worker processes, on this host or any host that can reach the spool file,
+claim and run them. Workers send heartbeats while converting; jobs whose
+worker stops sending heartbeats are handed out again.
+
+    python distributed.py submit --output-dir out/ a.mp4 b.mov --preset "Web Optimized (MP4)"
+    python distributed.py worker
+    python distributed.py status
+"""
+
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+
+from config import (BROKER_DB_PATH, BROKER_HEARTBEAT_INTERVAL, BROKER_JOB_TIMEOUT,
+                    BROKER_MAX_ATTEMPTS, BROKER_POLL_INTERVAL)
+from utils import get_output_filepath, get_scratch_filepath, atomic_move
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    input_path TEXT NOT NULL,
+    output_path TEXT NOT NULL,
+    settings TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    worker TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    heartbeat REAL,
+    message TEXT,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id);
+"""
+
+def encode_settings(settings):
+    return json.dumps(settings)
+
+def decode_settings(data):
+    settings = json.loads(data)
+    # JSON has no tuples; resolution is a (width, height) tuple everywhere else
+    if settings.get('resolution'):
+        settings['resolution'] = tuple(settings['resolution'])
+    return settings
+
+class JobBroker:
+    def __init__(self, db_path=BROKER_DB_PATH, job_timeout=BROKER_JOB_TIMEOUT,
+                 max_attempts=BROKER_MAX_ATTEMPTS):
+        self.db_path = db_path
+        self.job_timeout = job_timeout
+        self.max_attempts = max_attempts
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        with self.connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def connect(self):
+        """Open a new connection; each thread and process uses its own"""
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def submit(self, input_path, output_path, settings):
+        """Queue a single conversion job and return its id"""
+        now = time.time()
+        with self.connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO jobs (input_path, output_path, settings, created, updated) VALUES (?, ?, ?, ?, ?)",
+                (input_path, output_path, encode_settings(settings), now, now)
+            )
+            return cursor.lastrowid
+
+    def submit_batch(self, file_list, output_dir, settings):
+        """Queue one job per file, mirroring convert_batch's output naming"""
+        return [
+            self.submit(input_path, get_output_filepath(input_path, output_dir, settings['format']), settings)
+            for input_path in file_list
+        ]
+
+    def claim(self, worker_id):
+        """Atomically take the oldest queued job, or return None"""
+        conn = self.connect()
+        try:
+            # IMMEDIATE takes the write lock up front so two workers never claim the same row
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1"
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            now = time.time()
+            conn.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, attempts = attempts + 1, "
+                "heartbeat = ?, updated = ? WHERE id = ?",
+                (worker_id, now, now, row['id'])
+            )
+            conn.execute("COMMIT")
+            job = dict(row)
+            job['settings'] = decode_settings(job['settings'])
+            job['attempts'] += 1
+            return job
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def heartbeat(self, job_id, worker_id):
+        """Record that a worker is still busy with a job; False if the job was taken away"""
+        with self.connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET heartbeat = ? WHERE id = ? AND worker = ? AND status = 'running'",
+                (time.time(), job_id, worker_id)
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, job_id, worker_id, success, message):
+        """Report the result of a job; False if the worker no longer holds it"""
+        status = 'done' if success else 'failed'
+        with self.connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, message = ?, updated = ? "
+                "WHERE id = ? AND worker = ? AND status = 'running'",
+                (status, message, time.time(), job_id, worker_id)
+            )
+            return cursor.rowcount == 1
+
+    def requeue_stale(self):
+        """Retry jobs whose worker stopped sending heartbeats; give up after max_attempts"""
+        cutoff = time.time() - self.job_timeout
+        now = time.time()
+        with self.connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', message = 'Worker lost too many times', updated = ? "
+                "WHERE status = 'running' AND heartbeat < ? AND attempts >= ?",
+                (now, cutoff, self.max_attempts)
+            )
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'queued', worker = NULL, updated = ? "
+                "WHERE status = 'running' AND heartbeat < ?",
+                (now, cutoff)
+            )
+            return cursor.rowcount
+
+    def status(self):
+        """Return job counts by status"""
+        with self.connect() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    def results(self):
+        """Return (input_path, status, message) for finished jobs"""
+        with self.connect() as conn:
+            rows = conn.execute(
+                "SELECT input_path, status, message FROM jobs WHERE status IN ('done', 'failed') ORDER BY id"
+            ).fetchall()
+        return [tuple(row) for row in rows]
+
+class Worker:
+    def __init__(self, broker, worker_id=None, heartbeat_interval=BROKER_HEARTBEAT_INTERVAL,
+                 poll_interval=BROKER_POLL_INTERVAL):
+        self.broker = broker
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.heartbeat_interval = heartbeat_interval
+        self.poll_interval = poll_interval
+
+    def log(self, message):
+        print(f"[{self.worker_id}] {message}", flush=True)
+
+    def run_job(self, job):
+        """
+        Convert a claimed job; returns (success, message), or None if the lease
+        was lost, in which case nothing is written to the output path
+        """
+        from converter import VideoConverter
+
+        converter = VideoConverter()
+        converter.progress_update.connect(self.log)
+
+        stop = threading.Event()
+
+        def send_heartbeats():
+            while not stop.wait(self.heartbeat_interval):
+                if not self.broker.heartbeat(job['id'], self.worker_id):
+                    self.log(f"Lost lease on job {job['id']}")
+                    return
+
+        # Convert to a private file and move it into place only while still
+        # holding the lease, so a worker that lost the job never overwrites
+        # the output of the worker that took it over
+        partial_path = get_scratch_filepath(job['output_path'])
+        heartbeat_thread = threading.Thread(target=send_heartbeats, daemon=True)
+        heartbeat_thread.start()
+        try:
+            success, message = converter.convert_with_settings(job['input_path'], partial_path, job['settings'])
+            stop.set()
+            heartbeat_thread.join()
+            # A fresh heartbeat also extends the lease for the move below
+            if not self.broker.heartbeat(job['id'], self.worker_id):
+                return None
+            if success:
+                atomic_move(partial_path, job['output_path'])
+            return success, message
+        finally:
+            stop.set()
+            heartbeat_thread.join()
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+
+    def run(self, exit_when_idle=False):
+        """Claim and run jobs until interrupted (or until the queue is empty)"""
+        self.log("Worker started")
+        while True:
+            requeued = self.broker.requeue_stale()
+            if requeued:
+                self.log(f"Requeued {requeued} job(s) from lost workers")
+
+            job = self.broker.claim(self.worker_id)
+            if job is None:
+                if exit_when_idle and not self.broker.status().get('running'):
+                    self.log("Queue empty, exiting")
+                    return
+                time.sleep(self.poll_interval)
+                continue
+
+            self.log(f"Job {job['id']} (attempt {job['attempts']}): {os.path.basename(job['input_path'])}")
+            try:
+                result = self.run_job(job)
+            except Exception as e:
+                result = False, f"Conversion failed: {e}"
+            # A requeued job belongs to whoever claimed it next; don't overwrite its result
+            if result is None or not self.broker.complete(job['id'], self.worker_id, *result):
+                self.log(f"Lost lease on job {job['id']}, discarding result")
+                continue
+            success, message = result
+            self.log(f"{'✓' if success else '✗'} Job {job['id']}: {message}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Distributed video conversion")
+    parser.add_argument('--db', default=BROKER_DB_PATH, help="Path to the shared job spool")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    submit_parser = subparsers.add_parser('submit', help="Queue files for conversion")
+    submit_parser.add_argument('files', nargs='+')
+    submit_parser.add_argument('--output-dir', required=True)
+    submit_parser.add_argument('--preset', help="Name of a conversion preset")
+    submit_parser.add_argument('--settings', help="Settings as JSON (overrides the preset)")
+
+    worker_parser = subparsers.add_parser('worker', help="Run a worker")
+    worker_parser.add_argument('--id', help="Worker id (default: host-pid)")
+    worker_parser.add_argument('--exit-when-idle', action='store_true')
+
+    subparsers.add_parser('status', help="Show job counts and results")
+
+    args = parser.parse_args(argv)
+    broker = JobBroker(args.db)
+
+    if args.command == 'submit':
+        from presets import get_preset_store, PresetError
+        from config import DEFAULT_OUTPUT_FORMAT, DEFAULT_CODEC, DEFAULT_BITRATE
+
+        settings = {'format': DEFAULT_OUTPUT_FORMAT, 'resolution': None,
+                    'codec': DEFAULT_CODEC, 'bitrate': DEFAULT_BITRATE}
+        if args.preset:
+            store = get_preset_store()
+            try:
+                store.check()
+            except PresetError as e:
+                parser.error(str(e))
+            preset = store.get(args.preset)
+            if preset is None:
+                parser.error(f"Unknown preset: {args.preset}")
+            settings.update({key: value for key, value in preset.as_dict().items() if key != 'description'})
+        if args.settings:
+            settings.update(decode_settings(args.settings))
+        job_ids = broker.submit_batch([os.path.abspath(path) for path in args.files],
+                                      os.path.abspath(args.output_dir), settings)
+        print(f"Queued {len(job_ids)} job(s)")
+    elif args.command == 'worker':
+        try:
+            Worker(broker, args.id).run(exit_when_idle=args.exit_when_idle)
+        except KeyboardInterrupt:
+            pass
+    else:
+        for status, count in sorted(broker.status().items()):
+            print(f"{status}: {count}")
+        for input_path, status, message in broker.results():
+            print(f"{'✓' if status == 'done' else '✗'} {os.path.basename(input_path)}: {message}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
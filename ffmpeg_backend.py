@@ -0,0 +1,176 @@
+import json
+import os
+import shutil
+import subprocess
+
+from config import (FASTSTART_FORMATS, DECODER_THREADS, DECODER_THREAD_TYPE, ENCODER_THREADS,
+                    OUTPUT_PIXEL_FORMAT, CONTAINER_PIXEL_FORMATS)
+from utils import get_trim_range
+
+# Thin helpers around the ffmpeg binary bundled with MoviePy. Used where we
+# want ffmpeg to do the work directly instead of piping frames through Python.
+
+def get_ffmpeg_binary():
+    """Return the ffmpeg executable used by MoviePy, falling back to PATH"""
+    try:
+        from moviepy.config import FFMPEG_BINARY
+        return FFMPEG_BINARY
+    except ImportError:
+        return 'ffmpeg'
+
+def get_ffprobe_binary():
+    """Return the ffprobe next to the ffmpeg binary or on PATH, or None (MoviePy doesn't bundle it)"""
+    ffmpeg = get_ffmpeg_binary()
+    directory, name = os.path.split(ffmpeg)
+    if directory and 'ffmpeg' in name:
+        candidate = os.path.join(directory, name.replace('ffmpeg', 'ffprobe'))
+        if os.path.isfile(candidate):
+            return candidate
+    return shutil.which('ffprobe')
+
+def probe_stream_durations(input_path):
+    """
+    Return {'video': seconds, 'audio': seconds} for the first video and audio
+    streams from container metadata, without reading packets. Streams whose
+    duration isn't in the metadata (or everything, without ffprobe) are None.
+    """
+    durations = {'video': None, 'audio': None}
+    ffprobe = get_ffprobe_binary()
+    if not ffprobe:
+        return durations
+    cmd = [ffprobe, '-v', 'error', '-show_entries', 'stream=codec_type,duration', '-of', 'json', input_path]
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, universal_newlines=True)
+    if result.returncode != 0:
+        return durations
+    try:
+        streams = json.loads(result.stdout).get('streams', [])
+    except ValueError:
+        return durations
+    for stream in streams:
+        kind = stream.get('codec_type')
+        if kind in durations and durations[kind] is None:
+            try:
+                durations[kind] = float(stream['duration'])
+            except (KeyError, ValueError):
+                pass
+    return durations
+
+def probe_video(input_path):
+    """Return basic stream information for a video file"""
+    from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+
+    infos = ffmpeg_parse_infos(input_path)
+    return {
+        'duration': infos.get('duration') or 0.0,
+        'fps': infos.get('video_fps') or 0.0,
+        'size': tuple(infos['video_size']) if infos.get('video_size') else None,
+        'n_frames': infos.get('video_n_frames') or 0,
+        'bitrate': infos.get('video_bitrate'),
+        'has_audio': bool(infos.get('audio_found'))
+    }
+
+def get_output_duration(settings, source_duration):
+    """Return the length in seconds of the output for a settings dict"""
+    start, length = get_trim_range(settings.get('start'), settings.get('end'), settings.get('duration'))
+    if length is None:
+        return max(0.0, source_duration - start)
+    return min(length, max(0.0, source_duration - start))
+
+def get_pixel_format(settings, output_path):
+    """Return the -pix_fmt for a settings dict, or None to keep ffmpeg's negotiated format"""
+    pixel_format = settings.get('pixel_format', OUTPUT_PIXEL_FORMAT)
+    if pixel_format == 'auto':
+        return CONTAINER_PIXEL_FORMATS.get(os.path.splitext(output_path)[1].lower())
+    return pixel_format
+
+def build_ffmpeg_command(input_path, output_path, settings, start=None, duration=None):
+    """
+    Build an ffmpeg command line for a settings dict as returned by
+    get_conversion_settings. start/duration, if given, replace the trim
+    options in settings.
+    """
+    cmd = [get_ffmpeg_binary(), '-y', '-hide_banner', '-loglevel', 'error']
+
+    if start is None and duration is None:
+        start, duration = get_trim_range(settings.get('start'), settings.get('end'), settings.get('duration'))
+
+    # Input-side seek jumps to the nearest keyframe before decoding starts;
+    # ffmpeg then discards the few decoded frames before start, so the trim is exact
+    if start:
+        cmd += ['-ss', f"{start:.3f}"]
+    # Decoder threading applies to the input, so it goes before -i
+    decoder_threads = settings.get('decoder_threads', DECODER_THREADS)
+    if decoder_threads:
+        cmd += ['-threads', str(decoder_threads)]
+    thread_type = settings.get('thread_type', DECODER_THREAD_TYPE)
+    if thread_type:
+        cmd += ['-thread_type', thread_type]
+    cmd += ['-i', input_path]
+    if duration:
+        cmd += ['-t', f"{duration:.3f}"]
+
+    filters = []
+    if settings.get('fps'):
+        # Drop frames first so the scaler and encoder only see frames that are kept
+        filters.append(f"fps={settings['fps']}")
+    resolution = settings.get('resolution')
+    if resolution:
+        # swscale works on the decoder's YUV planes directly; no RGB conversion
+        filters.append(f"scale={resolution[0]}:{resolution[1]}")
+    if filters:
+        cmd += ['-vf', ','.join(filters)]
+
+    if settings.get('codec'):
+        cmd += ['-c:v', settings['codec']]
+    if settings.get('bitrate'):
+        cmd += ['-b:v', settings['bitrate']]
+    encoder_threads = settings.get('encoder_threads', ENCODER_THREADS)
+    if encoder_threads:
+        cmd += ['-threads', str(encoder_threads)]
+    pixel_format = get_pixel_format(settings, output_path)
+    if pixel_format:
+        cmd += ['-pix_fmt', pixel_format]
+    if os.path.splitext(output_path)[1].lower() in FASTSTART_FORMATS:
+        cmd += ['-movflags', '+faststart']
+
+    cmd.append(output_path)
+    return cmd
+
+def parse_progress(line, duration):
+    """Turn an ffmpeg -progress line into a percentage, or None"""
+    key, _, value = line.strip().partition('=')
+    if key != 'out_time_us' or not duration:
+        return None
+    try:
+        seconds = int(value) / 1000000
+    except ValueError:
+        return None
+    return max(0, min(100, int((seconds / duration) * 100)))
+
+def run_ffmpeg(cmd, duration=None, progress_callback=None):
+    """
+    Run an ffmpeg command, reporting progress if a callback is given.
+    Returns (success, message).
+    """
+    cmd = cmd[:1] + ['-progress', 'pipe:1', '-nostats'] + cmd[1:]
+    try:
+        process = subprocess.Popen(
+            cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            universal_newlines=True
+        )
+    except OSError as e:
+        return False, f"Could not start ffmpeg: {e}"
+
+    for line in process.stdout:
+        percentage = parse_progress(line, duration)
+        if percentage is not None and progress_callback:
+            progress_callback(percentage)
+
+    stderr = process.stderr.read()
+    process.wait()
+    if process.returncode != 0:
+        output_path = cmd[-1]
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        return False, stderr.strip() or f"ffmpeg exited with code {process.returncode}"
+    return True, "ffmpeg finished successfully"
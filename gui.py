@@ -1,31 +1,36 @@
 import sys
 import os
+import time
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, 
                              QWidget, QPushButton, QLabel, QLineEdit, QComboBox, 
                              QProgressBar, QTextEdit, QFileDialog, QGroupBox, 
                              QGridLayout, QMessageBox, QTabWidget, QListWidget,
-                             QCheckBox, QSplitter)
-from PyQt5.QtCore import QThread, pyqtSignal, Qt
-from PyQt5.QtGui import QFont, QPalette, QColor
+                             QDoubleSpinBox, QSpinBox, QCheckBox)
+from PyQt5.QtCore import QThread, pyqtSignal, Qt, QUrl, QTimer
+from PyQt5.QtGui import QPixmap, QDesktopServices
 
-from converter import VideoConverter
+# converter and preview pull in MoviePy and NumPy; they are imported in the
+# worker threads on first use so the window can appear without them
 from config import *
 from utils import is_valid_video_file, get_output_filepath
-from presets import get_preset_names, get_preset_settings, get_preset_description
+from presets import get_preset_store, get_preset_settings, get_preset_description
 
 class ConversionThread(QThread):
     progress_update = pyqtSignal(str)
     conversion_complete = pyqtSignal(bool, str)
     progress_percentage = pyqtSignal(int)
     
-    def __init__(self, input_paths, output_dir, settings, batch_mode=False):
+    def __init__(self, input_paths, output_dir, settings, batch_mode=False, max_parallel=BATCH_MAX_PARALLEL):
         super().__init__()
         self.input_paths = input_paths if isinstance(input_paths, list) else [input_paths]
         self.output_dir = output_dir
         self.settings = settings
         self.batch_mode = batch_mode
+        self.max_parallel = max_parallel
         
     def run(self):
+        from converter import VideoConverter
+        
         converter = VideoConverter()
         converter.progress_update.connect(self.progress_update.emit)
         
@@ -33,7 +38,8 @@ class ConversionThread(QThread):
             # Batch conversion
             successful, failed = converter.convert_batch(
                 self.input_paths, self.output_dir, self.settings,
-                progress_callback=self.progress_percentage.emit
+                progress_callback=self.progress_percentage.emit,
+                max_parallel=self.max_parallel
             )
             
             if failed:
@@ -46,19 +52,69 @@ class ConversionThread(QThread):
             input_path = self.input_paths[0]
             output_path = get_output_filepath(input_path, self.output_dir, self.settings['format'])
             
-            success, message = converter.convert_video(
-                input_path, output_path,
-                self.settings.get('resolution'),
-                self.settings.get('bitrate'),
-                self.settings.get('codec')
-            )
+            success, message = converter.convert_with_settings(input_path, output_path, self.settings)
             self.conversion_complete.emit(success, message)
 
+class PreviewThread(QThread):
+    progress_update = pyqtSignal(str)
+    thumbnails_ready = pyqtSignal(list)
+    sample_ready = pyqtSignal(bool, str)
+    progress_percentage = pyqtSignal(int)
+    
+    def __init__(self, input_path, settings=None, render_sample=False):
+        super().__init__()
+        self.input_path = input_path
+        self.settings = settings
+        self.render_sample = render_sample
+        
+    def run(self):
+        from preview import PreviewGenerator
+        
+        generator = PreviewGenerator()
+        generator.progress_update.connect(self.progress_update.emit)
+        
+        if self.render_sample:
+            success, result = generator.render_sample(
+                self.input_path, self.settings,
+                progress_callback=self.progress_percentage.emit
+            )
+            self.sample_ready.emit(success, result)
+        else:
+            success, result = generator.extract_thumbnails(self.input_path)
+            if success:
+                self.thumbnails_ready.emit(result)
+            else:
+                self.progress_update.emit(f"✗ {result}")
+                self.thumbnails_ready.emit([])
+
 class VideoConverterGUI(QMainWindow):
-    def __init__(self):
+    def __init__(self, start_time=None):
         super().__init__()
+        self.start_time = start_time
+        # Has no widget; set by apply_preset, otherwise follows the output container
+        self.pixel_format = OUTPUT_PIXEL_FORMAT
         self.init_ui()
         self.conversion_thread = None
+        self.preview_thread = None
+        
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if self.start_time is not None:
+            self.report_startup_time(time.perf_counter() - self.start_time)
+            self.start_time = None
+    
+    def report_startup_time(self, elapsed):
+        elapsed_ms = elapsed * 1000
+        message = f"Window ready in {elapsed_ms:.0f} ms"
+        if elapsed_ms > STARTUP_BUDGET_MS:
+            message += f" (over the {STARTUP_BUDGET_MS} ms startup budget)"
+            print(message, file=sys.stderr)
+        self.log_text.append(message)
+        
+        # Used by benchmark.py to measure startup without user interaction
+        if os.environ.get('VIDEO_CONVERTER_STARTUP_PROBE'):
+            print(f"startup_ms={elapsed_ms:.1f}", flush=True)
+            QTimer.singleShot(0, QApplication.quit)
         
     def init_ui(self):
         self.setWindowTitle("Modern Video Converter")
@@ -164,6 +220,9 @@ class VideoConverterGUI(QMainWindow):
         # Progress and log section (shared)
         self.create_progress_section(main_layout)
         
+        for error in get_preset_store().errors:
+            self.log_text.append(f"✗ Skipped invalid preset - {error}")
+        
     def create_single_conversion_tab(self):
         tab = QWidget()
         layout = QVBoxLayout(tab)
@@ -219,6 +278,32 @@ class VideoConverterGUI(QMainWindow):
         self.bitrate_combo.setCurrentText('Medium (1000k)')
         output_layout.addWidget(self.bitrate_combo, 4, 1, 1, 2)
         
+        # Frame rate
+        output_layout.addWidget(QLabel("Frame Rate:"), 5, 0)
+        self.fps_combo = QComboBox()
+        self.fps_combo.addItems(list(FRAME_RATE_PRESETS.keys()))
+        output_layout.addWidget(self.fps_combo, 5, 1, 1, 2)
+        
+        # Trim (0 means from the beginning / to the end)
+        output_layout.addWidget(QLabel("Trim (seconds):"), 6, 0)
+        self.trim_start_spin = QDoubleSpinBox()
+        self.trim_end_spin = QDoubleSpinBox()
+        for spin, placeholder in ((self.trim_start_spin, "Start"), (self.trim_end_spin, "End")):
+            spin.setRange(0, 24 * 60 * 60)
+            spin.setDecimals(2)
+            spin.setSpecialValueText(placeholder)
+        output_layout.addWidget(self.trim_start_spin, 6, 1)
+        output_layout.addWidget(self.trim_end_spin, 6, 2)
+        
+        # Verification
+        output_layout.addWidget(QLabel("Verification:"), 7, 0)
+        self.verify_check = QCheckBox("Verify output")
+        self.verify_check.setChecked(VERIFY_OUTPUT)
+        self.verify_quality_check = QCheckBox("Check quality (PSNR/SSIM)")
+        self.verify_quality_check.setChecked(VERIFY_QUALITY)
+        output_layout.addWidget(self.verify_check, 7, 1)
+        output_layout.addWidget(self.verify_quality_check, 7, 2)
+        
         # Control buttons
         control_layout = QHBoxLayout()
         self.convert_btn = QPushButton("Convert Video")
@@ -229,8 +314,34 @@ class VideoConverterGUI(QMainWindow):
         control_layout.addWidget(self.convert_btn)
         control_layout.addStretch()
         
+        # Preview section
+        preview_group = QGroupBox("Preview")
+        preview_layout = QVBoxLayout(preview_group)
+        
+        self.thumbnail_layout = QHBoxLayout()
+        self.thumbnail_labels = []
+        for _ in range(PREVIEW_THUMBNAIL_COUNT):
+            label = QLabel()
+            label.setAlignment(Qt.AlignCenter)
+            label.setMinimumHeight(90)
+            self.thumbnail_labels.append(label)
+            self.thumbnail_layout.addWidget(label)
+        
+        preview_controls = QHBoxLayout()
+        self.thumbnails_btn = QPushButton("Show Thumbnails")
+        self.thumbnails_btn.clicked.connect(self.start_thumbnail_preview)
+        self.sample_btn = QPushButton(f"Render {PREVIEW_SAMPLE_SECONDS}s Sample")
+        self.sample_btn.clicked.connect(self.start_sample_preview)
+        preview_controls.addWidget(self.thumbnails_btn)
+        preview_controls.addWidget(self.sample_btn)
+        preview_controls.addStretch()
+        
+        preview_layout.addLayout(self.thumbnail_layout)
+        preview_layout.addLayout(preview_controls)
+        
         layout.addWidget(input_group)
         layout.addWidget(output_group)
+        layout.addWidget(preview_group)
         layout.addLayout(control_layout)
         layout.addStretch()
         
@@ -278,6 +389,13 @@ class VideoConverterGUI(QMainWindow):
         batch_settings_layout.addWidget(self.batch_output_dir_edit, 0, 1)
         batch_settings_layout.addWidget(self.batch_browse_output_btn, 0, 2)
         
+        # Parallel jobs; extra jobs only start while memory, disk and CPU allow
+        batch_settings_layout.addWidget(QLabel("Parallel Jobs:"), 1, 0)
+        self.parallel_jobs_spin = QSpinBox()
+        self.parallel_jobs_spin.setRange(1, os.cpu_count() or 1)
+        self.parallel_jobs_spin.setValue(BATCH_MAX_PARALLEL)
+        batch_settings_layout.addWidget(self.parallel_jobs_spin, 1, 1, 1, 2)
+        
         # Batch control
         batch_control_layout = QHBoxLayout()
         self.batch_convert_btn = QPushButton("Convert All Files")
@@ -303,7 +421,8 @@ class VideoConverterGUI(QMainWindow):
         presets_layout = QVBoxLayout(presets_group)
         
         self.presets_list = QListWidget()
-        self.presets_list.addItems(get_preset_names())
+        preset_store = get_preset_store()
+        self.presets_list.addItems(preset_store.names())
         self.presets_list.currentItemChanged.connect(self.on_preset_selected)
         
         self.apply_preset_btn = QPushButton("Apply Preset to Single Conversion")
@@ -342,94 +461,6 @@ class VideoConverterGUI(QMainWindow):
         main_layout.addWidget(self.progress_bar)
         main_layout.addWidget(log_group)
         
-    def browse_input_file(self):
-        file_path, _ = QFileDialog.getOpenFileName(
-            self, "Select Input Video", "", 
-            "Video Files (*.mp4 *.avi *.mkv *.mov *.wmv *.flv *.webm *.m4v)"
-        )
-        if file_path:
-            self.input_path_edit.setText(file_path)
-            
-    def browse_output_dir(self):
-        dir_path = QFileDialog.getExistingDirectory(self, "Select Output Directory")
-        if dir_path:
-            self.output_dir_edit.setText(dir_path)
-            
-    def start_conversion(self):
-        input_path = self.input_path_edit.text().strip()
-        output_dir = self.output_dir_edit.text().strip()
-        
-        # Validation
-        if not input_path:
-            QMessageBox.warning(self, "Warning", "Please select an input video file.")
-            return
-            
-        if not output_dir:
-            QMessageBox.warning(self, "Warning", "Please select an output directory.")
-            return
-            
-        if not is_valid_video_file(input_path, SUPPORTED_INPUT_FORMATS):
-            QMessageBox.warning(self, "Warning", "Invalid input video file.")
-            return
-            
-        if not os.path.isdir(output_dir):
-            QMessageBox.warning(self, "Warning", "Invalid output directory.")
-            return
-        
-        # Get settings
-        output_format = self.format_combo.currentText()
-        resolution_key = self.resolution_combo.currentText()
-        resolution = RESOLUTION_PRESETS[resolution_key]
-        codec_key = self.codec_combo.currentText()
-        codec = CODEC_OPTIONS[codec_key]
-        bitrate_key = self.bitrate_combo.currentText()
-        bitrate = BITRATE_PRESETS[bitrate_key]
-        
-        # Generate output path
-        output_path = get_output_filepath(input_path, output_dir, output_format)
-        
-        # Start conversion in separate thread
-        self.conversion_thread = ConversionThread(
-            input_path, output_path, resolution, bitrate, codec
-        )
-        self.conversion_thread.progress_update.connect(self.update_progress)
-        self.conversion_thread.conversion_complete.connect(self.conversion_finished)
-        
-        # Update UI
-        self.convert_btn.setEnabled(False)
-        self.convert_btn.setText("Converting...")
-        self.progress_bar.setVisible(True)
-        self.progress_bar.setRange(0, 0)  # Indeterminate progress
-        self.log_text.clear()
-        
-        self.conversion_thread.start()
-        
-    def update_progress(self, message):
-        self.log_text.append(message)
-        
-    def conversion_finished(self, success, message):
-        self.convert_btn.setEnabled(True)
-        self.convert_btn.setText("Convert Video")
-        self.progress_bar.setVisible(False)
-        
-        if success:
-            self.log_text.append(f"✓ {message}")
-            QMessageBox.information(self, "Success", "Video conversion completed successfully!")
-        else:
-            self.log_text.append(f"✗ {message}")
-            QMessageBox.critical(self, "Error", f"Conversion failed: {message}")
-
-def main():
-    app = QApplication(sys.argv)
-    window = VideoConverterGUI()
-    window.show()
-    sys.exit(app.exec_())
-
-if __name__ == '__main__':
-    main()
-
-
-        
     def browse_input_file(self):
         file_path, _ = QFileDialog.getOpenFileName(
             self, "Select Input Video", "", 
@@ -477,6 +508,13 @@ if __name__ == '__main__':
                 details += f"Codec: {preset_settings['codec']}\n"
                 details += f"Resolution: {preset_settings['resolution'] or 'Original'}\n"
                 details += f"Bitrate: {preset_settings['bitrate']}\n"
+                details += f"Frame Rate: {preset_settings['fps'] or 'Original'}\n"
+                if preset_settings['start'] or preset_settings['end'] or preset_settings['duration']:
+                    details += f"Start: {preset_settings['start'] or 0}s\n"
+                    if preset_settings['end']:
+                        details += f"End: {preset_settings['end']}s\n"
+                    if preset_settings['duration']:
+                        details += f"Duration: {preset_settings['duration']}s\n"
                 
                 self.preset_details.setText(details)
     
@@ -487,35 +525,31 @@ if __name__ == '__main__':
             return
         
         preset_name = current_item.text()
-        preset_settings = get_preset_settings(preset_name)
+        preset = get_preset_store().get(preset_name)
         
-        if preset_settings:
-            # Apply to single conversion tab
-            self.format_combo.setCurrentText(preset_settings['format'])
+        if preset:
+            # Apply to single conversion tab; combo labels were resolved when the preset was loaded
+            self.format_combo.setCurrentText(preset.format)
             
-            # Find and set resolution
-            resolution = preset_settings['resolution']
-            if resolution:
-                for key, value in RESOLUTION_PRESETS.items():
-                    if value == resolution:
-                        self.resolution_combo.setCurrentText(key)
-                        break
-            else:
-                self.resolution_combo.setCurrentText('Original')
+            for combo, label, value in ((self.resolution_combo, preset.resolution_label, preset.resolution),
+                                        (self.codec_combo, preset.codec_label, preset.codec),
+                                        (self.bitrate_combo, preset.bitrate_label, preset.bitrate),
+                                        (self.fps_combo, preset.fps_label, preset.fps)):
+                if label:
+                    combo.setCurrentText(label)
+                else:
+                    self.log_text.append(f"Preset value {value} has no matching option; kept current setting")
             
-            # Find and set codec
-            codec = preset_settings['codec']
-            for key, value in CODEC_OPTIONS.items():
-                if value == codec:
-                    self.codec_combo.setCurrentText(key)
-                    break
+            self.pixel_format = preset.pixel_format
             
-            # Find and set bitrate
-            bitrate = preset_settings['bitrate']
-            for key, value in BITRATE_PRESETS.items():
-                if value == bitrate:
-                    self.bitrate_combo.setCurrentText(key)
-                    break
+            start = preset.start or 0
+            self.trim_start_spin.setValue(start)
+            if preset.end:
+                self.trim_end_spin.setValue(preset.end)
+            elif preset.duration:
+                self.trim_end_spin.setValue(start + preset.duration)
+            else:
+                self.trim_end_spin.setValue(0)
             
             # Switch to single conversion tab
             self.tab_widget.setCurrentIndex(0)
@@ -568,7 +602,8 @@ if __name__ == '__main__':
         settings = self.get_conversion_settings()
         
         # Start batch conversion
-        self.start_conversion(file_paths, output_dir, settings, batch_mode=True)
+        self.start_conversion(file_paths, output_dir, settings, batch_mode=True,
+                              max_parallel=self.parallel_jobs_spin.value())
     
     def get_conversion_settings(self):
         output_format = self.format_combo.currentText()
@@ -578,18 +613,29 @@ if __name__ == '__main__':
         codec = CODEC_OPTIONS[codec_key]
         bitrate_key = self.bitrate_combo.currentText()
         bitrate = BITRATE_PRESETS[bitrate_key]
+        fps = FRAME_RATE_PRESETS[self.fps_combo.currentText()]
         
         return {
             'format': output_format,
             'resolution': resolution,
             'codec': codec,
-            'bitrate': bitrate
+            'bitrate': bitrate,
+            'fps': fps,
+            'start': self.trim_start_spin.value() or None,
+            'end': self.trim_end_spin.value() or None,
+            'pixel_format': self.pixel_format,
+            'verify': self.verify_check.isChecked() or self.verify_quality_check.isChecked(),
+            'verify_quality': self.verify_quality_check.isChecked()
         }
     
-    def start_conversion(self, input_paths, output_dir, settings, batch_mode=False):
+    def start_conversion(self, input_paths, output_dir, settings, batch_mode=False, max_parallel=1):
+        if settings['end'] and settings['end'] <= (settings['start'] or 0):
+            QMessageBox.warning(self, "Warning", "Trim end must be after the trim start.")
+            return
+        
         # Start conversion in separate thread
         self.conversion_thread = ConversionThread(
-            input_paths, output_dir, settings, batch_mode
+            input_paths, output_dir, settings, batch_mode, max_parallel
         )
         self.conversion_thread.progress_update.connect(self.update_progress)
         self.conversion_thread.conversion_complete.connect(self.conversion_finished)
@@ -607,6 +653,62 @@ if __name__ == '__main__':
         
         self.conversion_thread.start()
         
+    def get_preview_input(self):
+        input_path = self.input_path_edit.text().strip()
+        if not is_valid_video_file(input_path, SUPPORTED_INPUT_FORMATS):
+            QMessageBox.warning(self, "Warning", "Please select a valid input video file.")
+            return None
+        return input_path
+    
+    def start_thumbnail_preview(self):
+        input_path = self.get_preview_input()
+        if not input_path:
+            return
+        
+        self.preview_thread = PreviewThread(input_path)
+        self.preview_thread.progress_update.connect(self.update_progress)
+        self.preview_thread.thumbnails_ready.connect(self.show_thumbnails)
+        self.set_preview_enabled(False)
+        self.preview_thread.start()
+    
+    def start_sample_preview(self):
+        input_path = self.get_preview_input()
+        if not input_path:
+            return
+        
+        self.preview_thread = PreviewThread(input_path, self.get_conversion_settings(), render_sample=True)
+        self.preview_thread.progress_update.connect(self.update_progress)
+        self.preview_thread.progress_percentage.connect(self.update_progress_bar)
+        self.preview_thread.sample_ready.connect(self.sample_finished)
+        self.set_preview_enabled(False)
+        self.progress_bar.setVisible(True)
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.setValue(0)
+        self.preview_thread.start()
+    
+    def set_preview_enabled(self, enabled):
+        self.thumbnails_btn.setEnabled(enabled)
+        self.sample_btn.setEnabled(enabled)
+    
+    def show_thumbnails(self, thumbnail_paths):
+        self.set_preview_enabled(True)
+        for i, label in enumerate(self.thumbnail_labels):
+            if i < len(thumbnail_paths):
+                pixmap = QPixmap(thumbnail_paths[i])
+                label.setPixmap(pixmap.scaledToHeight(90, Qt.SmoothTransformation))
+            else:
+                label.clear()
+    
+    def sample_finished(self, success, result):
+        self.set_preview_enabled(True)
+        self.progress_bar.setVisible(False)
+        
+        if success:
+            self.log_text.append(f"✓ Sample ready: {result}")
+            QDesktopServices.openUrl(QUrl.fromLocalFile(result))
+        else:
+            self.log_text.append(f"✗ {result}")
+    
     def update_progress(self, message):
         self.log_text.append(message)
         
@@ -627,9 +729,13 @@ if __name__ == '__main__':
             self.log_text.append(f"✗ {message}")
             QMessageBox.critical(self, "Error", f"Conversion failed: {message}")
 
-def main():
+_module_start_time = time.perf_counter()
+
+def main(start_time=None):
+    if start_time is None:
+        start_time = _module_start_time
     app = QApplication(sys.argv)
-    window = VideoConverterGUI()
+    window = VideoConverterGUI(start_time)
     window.show()
     sys.exit(app.exec_())
 
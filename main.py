@@ -4,6 +4,10 @@ Modern Video Converter
 A user-friendly video conversion application built with Python and PyQt5.
 """
 
+import time
+
+START_TIME = time.perf_counter()
+
 import sys
 import os
 
@@ -13,5 +17,5 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 from gui import main
 
 if __name__ == '__main__':
-    main()
+    main(START_TIME)
 
@@ -1,11 +1,20 @@
 # Format presets for common conversion scenarios
 
+import json
+import math
+import os
+import re
+
+from config import (SUPPORTED_OUTPUT_FORMATS, RESOLUTION_PRESETS, CODEC_OPTIONS,
+                    BITRATE_PRESETS, FRAME_RATE_PRESETS, USER_PRESETS_DIR, CONTAINER_CODECS)
+
 CONVERSION_PRESETS = {
     "Web Optimized (MP4)": {
         "format": ".mp4",
         "codec": "libx264",
         "resolution": (1280, 720),
         "bitrate": "1000k",
+        "pixel_format": "yuv420p",
         "description": "Optimized for web streaming and social media"
     },
     "High Quality (MP4)": {
@@ -20,6 +29,7 @@ CONVERSION_PRESETS = {
         "codec": "libx264",
         "resolution": (854, 480),
         "bitrate": "500k",
+        "pixel_format": "yuv420p",
         "description": "Small file size for mobile devices"
     },
     "YouTube Upload": {
@@ -27,6 +37,7 @@ CONVERSION_PRESETS = {
         "codec": "libx264",
         "resolution": (1920, 1080),
         "bitrate": "2000k",
+        "pixel_format": "yuv420p",
         "description": "Optimized for YouTube uploads"
     },
     "Instagram Story": {
@@ -34,6 +45,7 @@ CONVERSION_PRESETS = {
         "codec": "libx264",
         "resolution": (1080, 1920),  # 9:16 aspect ratio
         "bitrate": "1500k",
+        "pixel_format": "yuv420p",
         "description": "Vertical format for Instagram stories"
     },
     "DVD Quality": {
@@ -52,16 +64,245 @@ CONVERSION_PRESETS = {
     }
 }
 
+PRESET_FIELDS = ('format', 'codec', 'resolution', 'bitrate', 'fps', 'start', 'end', 'duration',
+                 'pixel_format', 'description')
+BITRATE_PATTERN = re.compile(r'^[1-9][0-9]*[kM]$')
+PIXEL_FORMAT_PATTERN = re.compile(r'^[a-z0-9_]+$')
+
+# Reverse lookups from setting values to the labels shown in the GUI combos
+_RESOLUTION_LABELS = {value: key for key, value in RESOLUTION_PRESETS.items()}
+_CODEC_LABELS = {value: key for key, value in CODEC_OPTIONS.items()}
+_BITRATE_LABELS = {value: key for key, value in BITRATE_PRESETS.items()}
+_FRAME_RATE_LABELS = {value: key for key, value in FRAME_RATE_PRESETS.items()}
+
+class PresetError(ValueError):
+    pass
+
+class Preset:
+    """An immutable, validated conversion preset"""
+    __slots__ = ('name', 'format', 'codec', 'resolution', 'bitrate', 'fps', 'start', 'end', 'duration',
+                 'pixel_format', 'description', 'source',
+                 'resolution_label', 'codec_label', 'bitrate_label', 'fps_label')
+
+    def __init__(self, name, format, codec, resolution, bitrate, description, source,
+                 fps=None, start=None, end=None, duration=None, pixel_format='auto'):
+        values = {
+            'name': name, 'format': format, 'codec': codec, 'resolution': resolution,
+            'bitrate': bitrate, 'fps': fps, 'start': start, 'end': end, 'duration': duration,
+            'pixel_format': pixel_format, 'description': description, 'source': source,
+            'resolution_label': _RESOLUTION_LABELS.get(resolution),
+            'codec_label': _CODEC_LABELS.get(codec),
+            'bitrate_label': _BITRATE_LABELS.get(bitrate),
+            'fps_label': _FRAME_RATE_LABELS.get(fps)
+        }
+        for slot, value in values.items():
+            object.__setattr__(self, slot, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Preset objects are immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("Preset objects are immutable")
+
+    def __repr__(self):
+        return f"Preset({self.name!r})"
+
+    @property
+    def settings_key(self):
+        return (self.format, self.codec, self.resolution, self.bitrate,
+                self.fps, self.start, self.end, self.duration)
+
+    def as_dict(self):
+        """Return the preset as a settings dict, like the entries of CONVERSION_PRESETS"""
+        return {field: getattr(self, field) for field in PRESET_FIELDS}
+
+def parse_resolution(value):
+    """Accept None/'original', 'WxH' or [W, H] and return None or a (W, H) tuple"""
+    if value is None or (isinstance(value, str) and value.lower() == 'original'):
+        return None
+    if isinstance(value, str):
+        match = re.match(r'^(\d+)x(\d+)$', value.strip())
+        if not match:
+            raise PresetError(f"invalid resolution {value!r}, expected 'WIDTHxHEIGHT'")
+        value = (match.group(1), match.group(2))
+    if not isinstance(value, (list, tuple)) or len(value) != 2:
+        raise PresetError(f"invalid resolution {value!r}")
+    try:
+        width, height = int(value[0]), int(value[1])
+    except (TypeError, ValueError):
+        raise PresetError(f"invalid resolution {value!r}")
+    if width <= 0 or height <= 0 or width % 2 or height % 2:
+        raise PresetError(f"resolution {width}x{height} must be positive and even")
+    return (width, height)
+
+def parse_number(name, field, value, minimum=0.0):
+    """Validate an optional time or frame rate value and return it, or None"""
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value) or value < minimum:
+        raise PresetError(f"{name}: {field} must be a number >= {minimum}")
+    return value
+
+def compile_preset(name, data, source='built-in'):
+    """Validate a preset definition and return a Preset, raising PresetError if invalid"""
+    if not isinstance(data, dict):
+        raise PresetError(f"{name}: preset must be a table/object")
+    unknown = set(data) - set(PRESET_FIELDS)
+    if unknown:
+        raise PresetError(f"{name}: unknown field(s) {', '.join(sorted(unknown))}")
+
+    output_format = data.get('format')
+    if output_format not in SUPPORTED_OUTPUT_FORMATS:
+        raise PresetError(f"{name}: unsupported format {output_format!r}")
+    codec = data.get('codec')
+    if codec not in CODEC_OPTIONS.values():
+        raise PresetError(f"{name}: unsupported codec {codec!r}")
+    allowed_codecs = CONTAINER_CODECS.get(output_format)
+    if allowed_codecs and codec not in allowed_codecs:
+        raise PresetError(f"{name}: codec {codec!r} can't be stored in {output_format} "
+                          f"(use {', '.join(allowed_codecs)})")
+    bitrate = data.get('bitrate')
+    if bitrate != 'auto' and not (isinstance(bitrate, str) and BITRATE_PATTERN.match(bitrate)):
+        raise PresetError(f"{name}: invalid bitrate {bitrate!r}, expected e.g. '1500k' or 'auto'")
+    try:
+        resolution = parse_resolution(data.get('resolution'))
+    except PresetError as e:
+        raise PresetError(f"{name}: {e}")
+
+    fps = parse_number(name, 'fps', data.get('fps'), minimum=1)
+    start = parse_number(name, 'start', data.get('start'))
+    end = parse_number(name, 'end', data.get('end'))
+    duration = parse_number(name, 'duration', data.get('duration'))
+    if end is not None and duration is not None:
+        raise PresetError(f"{name}: give either end or duration, not both")
+    if end is not None and end <= (start or 0):
+        raise PresetError(f"{name}: end must be after start")
+    if duration == 0:
+        raise PresetError(f"{name}: duration must be positive")
+
+    # 'auto' uses the container's default, None keeps the source's pixel format
+    pixel_format = data.get('pixel_format', 'auto')
+    if pixel_format is not None and not (isinstance(pixel_format, str) and PIXEL_FORMAT_PATTERN.match(pixel_format)):
+        raise PresetError(f"{name}: invalid pixel_format {pixel_format!r}")
+
+    return Preset(name, output_format, codec, resolution, bitrate,
+                  str(data.get('description', '')), source,
+                  fps=fps, start=start, end=end, duration=duration, pixel_format=pixel_format)
+
+def read_preset_file(path):
+    """Read a JSON or TOML preset file into a {name: definition} mapping"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.json':
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    elif ext == '.toml':
+        try:
+            import tomllib
+        except ImportError:
+            # Python < 3.11
+            import tomli as tomllib
+        with open(path, 'rb') as f:
+            data = tomllib.load(f)
+    else:
+        raise PresetError(f"{path}: unsupported preset file type")
+    # Allow either a top-level mapping of presets or one nested under "presets"
+    if isinstance(data, dict) and isinstance(data.get('presets'), dict):
+        data = data['presets']
+    if not isinstance(data, dict):
+        raise PresetError(f"{path}: expected a mapping of preset names to settings")
+    return data
+
+class PresetStore:
+    """
+    Built-in and user presets, validated once at load time and indexed by
+    name and by their (format, codec, resolution, bitrate, fps, trim) settings.
+    Invalid presets are skipped and recorded in `errors`.
+    """
+
+    def __init__(self):
+        self.presets = {}
+        self.by_settings = {}
+        self.errors = []
+
+    def add(self, preset):
+        # A later preset with the same name (e.g. a user override) replaces the earlier one
+        previous = self.presets.get(preset.name)
+        if previous is not None:
+            self.by_settings[previous.settings_key].remove(previous)
+        self.presets[preset.name] = preset
+        self.by_settings.setdefault(preset.settings_key, []).append(preset)
+
+    def load_definitions(self, definitions, source):
+        loaded = 0
+        for name, data in definitions.items():
+            try:
+                self.add(compile_preset(name, data, source))
+                loaded += 1
+            except PresetError as e:
+                self.errors.append(f"{source}: {e}")
+        return loaded
+
+    def load_builtin(self):
+        return self.load_definitions(CONVERSION_PRESETS, 'built-in')
+
+    def load_file(self, path):
+        try:
+            definitions = read_preset_file(path)
+        except (OSError, ValueError, ImportError) as e:
+            # ImportError: a .toml file on Python < 3.11 without tomli installed
+            self.errors.append(f"{path}: {e}")
+            return 0
+        return self.load_definitions(definitions, path)
+
+    def load_directory(self, directory):
+        if not os.path.isdir(directory):
+            return 0
+        loaded = 0
+        for filename in sorted(os.listdir(directory)):
+            if os.path.splitext(filename)[1].lower() in ('.json', '.toml'):
+                loaded += self.load_file(os.path.join(directory, filename))
+        return loaded
+
+    def check(self):
+        """Raise PresetError if any preset failed validation"""
+        if self.errors:
+            raise PresetError("Invalid presets:\n" + "\n".join(self.errors))
+
+    def names(self):
+        return list(self.presets)
+
+    def get(self, name):
+        return self.presets.get(name)
+
+    def find(self, settings):
+        """Return the presets whose settings match a settings dict"""
+        key = (settings.get('format'), settings.get('codec'), settings.get('resolution'),
+               settings.get('bitrate'), settings.get('fps'), settings.get('start'),
+               settings.get('end'), settings.get('duration'))
+        return list(self.by_settings.get(key, ()))
+
+_store = None
+
+def get_preset_store():
+    """Return the shared store of built-in presets plus those in USER_PRESETS_DIR"""
+    global _store
+    if _store is None:
+        store = PresetStore()
+        store.load_builtin()
+        store.load_directory(USER_PRESETS_DIR)
+        _store = store
+    return _store
+
 def get_preset_names():
     """Return list of preset names"""
-    return list(CONVERSION_PRESETS.keys())
+    return get_preset_store().names()
 
 def get_preset_settings(preset_name):
     """Get settings for a specific preset"""
-    return CONVERSION_PRESETS.get(preset_name, None)
+    preset = get_preset_store().get(preset_name)
+    return preset.as_dict() if preset else None
 
 def get_preset_description(preset_name):
     """Get description for a specific preset"""
-    preset = CONVERSION_PRESETS.get(preset_name, {})
-    return preset.get("description", "No description available")
-
+    preset = get_preset_store().get(preset_name)
+    return preset.description if preset and preset.description else "No description available"
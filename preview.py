@@ -0,0 +1,111 @@
+import hashlib
+import os
+import subprocess
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from config import (PREVIEW_CACHE_DIR, PREVIEW_THUMBNAIL_COUNT,
+                    PREVIEW_THUMBNAIL_WIDTH, PREVIEW_SAMPLE_SECONDS)
+from analysis import resolve_auto_bitrate
+from ffmpeg_backend import get_ffmpeg_binary, probe_video, build_ffmpeg_command, run_ffmpeg, get_output_duration
+from utils import get_trim_range, get_scratch_filepath, atomic_move
+
+class PreviewGenerator(QObject):
+    progress_update = pyqtSignal(str)
+
+    def __init__(self, cache_dir=PREVIEW_CACHE_DIR):
+        super().__init__()
+        self.cache_dir = cache_dir
+
+    def get_cache_dir(self, input_path):
+        """Return the cache directory for a source file, keyed on its path, size and mtime"""
+        stat = os.stat(input_path)
+        key = f"{os.path.abspath(input_path)}|{stat.st_size}|{stat.st_mtime_ns}"
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        path = os.path.join(self.cache_dir, digest)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def extract_thumbnails(self, input_path, count=PREVIEW_THUMBNAIL_COUNT, width=PREVIEW_THUMBNAIL_WIDTH):
+        """
+        Extract evenly spaced keyframe thumbnails.
+        Returns (success, list of image paths or error message).
+        """
+        try:
+            cache_dir = self.get_cache_dir(input_path)
+            thumbnails = [os.path.join(cache_dir, f"thumb_{width}_{count}_{i}.jpg") for i in range(count)]
+            if all(os.path.exists(path) for path in thumbnails):
+                self.progress_update.emit(f"Using cached thumbnails for {os.path.basename(input_path)}")
+                return True, thumbnails
+
+            duration = probe_video(input_path)['duration']
+            self.progress_update.emit(f"Extracting {count} thumbnails from {os.path.basename(input_path)}")
+
+            for i, thumbnail_path in enumerate(thumbnails):
+                if os.path.exists(thumbnail_path):
+                    continue
+                timestamp = duration * (i + 0.5) / count
+                # Write under a temporary name so an interrupted extraction
+                # never leaves a truncated file that looks cached
+                partial_path = get_scratch_filepath(thumbnail_path)
+                # Seek on the input and decode keyframes only, so each
+                # thumbnail costs one keyframe decode instead of a linear scan
+                cmd = [
+                    get_ffmpeg_binary(), '-y', '-hide_banner', '-loglevel', 'error',
+                    '-skip_frame', 'nokey', '-noaccurate_seek',
+                    '-ss', f"{timestamp:.3f}", '-i', input_path,
+                    '-frames:v', '1', '-vf', f"scale={width}:-2",
+                    partial_path
+                ]
+                try:
+                    result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                                            universal_newlines=True)
+                    if result.returncode != 0 or not os.path.exists(partial_path):
+                        return False, result.stderr.strip() or "Thumbnail extraction failed"
+                    atomic_move(partial_path, thumbnail_path)
+                finally:
+                    if os.path.exists(partial_path):
+                        os.remove(partial_path)
+
+            return True, thumbnails
+
+        except Exception as e:
+            self.progress_update.emit(f"Error: {str(e)}")
+            return False, f"Thumbnail extraction failed: {e}"
+
+    def render_sample(self, input_path, settings, seconds=PREVIEW_SAMPLE_SECONDS, progress_callback=None):
+        """
+        Render a short sample from the middle of the source (or of its trim range) with the given settings.
+        Returns (success, sample path or error message).
+        """
+        try:
+            cache_dir = self.get_cache_dir(input_path)
+            settings_key = hashlib.sha1(repr(sorted(settings.items())).encode('utf-8')).hexdigest()[:12]
+            sample_path = os.path.join(cache_dir, f"sample_{settings_key}_{seconds}{settings['format']}")
+            if os.path.exists(sample_path):
+                self.progress_update.emit(f"Using cached sample for {os.path.basename(input_path)}")
+                return True, sample_path
+
+            source_duration = probe_video(input_path)['duration']
+            range_start = get_trim_range(settings.get('start'), settings.get('end'), settings.get('duration'))[0]
+            available = get_output_duration(settings, source_duration)
+            seconds = min(seconds, available) if available else seconds
+            start = range_start + max(0.0, (available - seconds) / 2)
+
+            self.progress_update.emit(f"Rendering {seconds:.0f}s sample of {os.path.basename(input_path)}")
+            settings = resolve_auto_bitrate(input_path, settings)
+            # Render under a temporary name, as for thumbnails
+            partial_path = get_scratch_filepath(sample_path)
+            cmd = build_ffmpeg_command(input_path, partial_path, settings, start=start, duration=seconds)
+            try:
+                success, message = run_ffmpeg(cmd, duration=seconds, progress_callback=progress_callback)
+                if not success:
+                    return False, f"Sample render failed: {message}"
+                atomic_move(partial_path, sample_path)
+            finally:
+                if os.path.exists(partial_path):
+                    os.remove(partial_path)
+            return True, sample_path
+
+        except Exception as e:
+            self.progress_update.emit(f"Error: {str(e)}")
+            return False, f"Sample render failed: {e}"
@@ -0,0 +1,121 @@
+import time
+
+from config import (RETRY_MAX_ATTEMPTS, RETRY_BACKOFF_SECONDS, RETRY_BACKOFF_FACTOR,
+                    RETRY_MAX_BACKOFF_SECONDS, BACKEND_FALLBACKS, CODEC_FALLBACKS,
+                    CONTAINER_CODECS, DEFAULT_BACKEND)
+
+# Substrings (lower case) of ffmpeg/MoviePy/OS errors, by failure class. Checked
+# in order: MoviePy wraps every encoder error in "[Errno 32] Broken pipe", so
+# ffmpeg's own error text has to win over the generic transient patterns.
+FAILURE_PATTERNS = {
+    # Our own checks; another attempt with the same or fallback settings won't pass them
+    'verification': [
+        'verification failed:'
+    ],
+    'settings': [
+        'trim end must be after the start'
+    ],
+    'codec': [
+        'unknown encoder', 'encoder not found', 'could not find tag for codec',
+        'not currently supported in container', 'error initializing output stream',
+        'incorrect codec parameters', 'codec not supported', 'invalid encoder'
+    ],
+    'input': [
+        'no such file or directory', 'invalid data found when processing input',
+        'moov atom not found', 'does not contain any stream', 'permission denied'
+    ],
+    'transient': [
+        'no space left on device', 'broken pipe', 'killed', 'resource temporarily unavailable',
+        'cannot allocate memory', 'connection reset', 'input/output error', 'timed out',
+        'stale file handle', 'device or resource busy'
+    ]
+}
+# Failures that no retry or fallback can fix
+PERMANENT_FAILURES = ('input', 'settings', 'verification')
+
+def classify_failure(message):
+    """Return a FAILURE_PATTERNS category or 'unknown' for a failure message"""
+    text = message.lower()
+    for category, patterns in FAILURE_PATTERNS.items():
+        if any(pattern in text for pattern in patterns):
+            return category
+    return 'unknown'
+
+class RetryPolicy:
+    """
+    Decides what to do after a failed conversion: retry transient failures
+    with exponential backoff, fall back to another codec for codec failures
+    and to another backend for unexplained ones, and give up on bad input,
+    invalid settings or output that failed verification.
+    """
+
+    def __init__(self, max_attempts=RETRY_MAX_ATTEMPTS, backoff=RETRY_BACKOFF_SECONDS,
+                 backoff_factor=RETRY_BACKOFF_FACTOR, max_backoff=RETRY_MAX_BACKOFF_SECONDS,
+                 backend_fallbacks=BACKEND_FALLBACKS, codec_fallbacks=CODEC_FALLBACKS,
+                 sleep=time.sleep):
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.backend_fallbacks = backend_fallbacks
+        self.codec_fallbacks = codec_fallbacks
+        self.sleep = sleep
+
+    def get_delay(self, retry_number):
+        return min(self.max_backoff, self.backoff * self.backoff_factor ** retry_number)
+
+    def fallback_backend(self, settings):
+        backend = self.backend_fallbacks.get(settings.get('backend', DEFAULT_BACKEND))
+        if not backend:
+            return None
+        return dict(settings, backend=backend)
+
+    def fallback_codec(self, settings, tried_codecs):
+        allowed = CONTAINER_CODECS.get(settings.get('format'))
+        for codec in self.codec_fallbacks.get(settings.get('codec'), []):
+            if codec in tried_codecs or (allowed and codec not in allowed):
+                continue
+            return dict(settings, codec=codec)
+        return None
+
+    def run(self, convert, settings, log=None):
+        """
+        Call convert(settings) -> (success, message) until it succeeds or the
+        policy gives up. Returns (success, message, category, settings_used).
+        """
+        log = log or (lambda message: None)
+        current = settings
+        tried_codecs = {settings.get('codec')}
+        transient_retries = 0
+        category = None
+
+        for attempt in range(1, self.max_attempts + 1):
+            success, message = convert(current)
+            if success:
+                return True, message, None, current
+
+            category = classify_failure(message)
+            if attempt == self.max_attempts or category in PERMANENT_FAILURES:
+                break
+
+            if category == 'transient':
+                delay = self.get_delay(transient_retries)
+                transient_retries += 1
+                log(f"Transient failure, retrying in {delay:.0f}s (attempt {attempt + 1}/{self.max_attempts})")
+                self.sleep(delay)
+                next_settings = current
+            else:
+                # Switching backend rarely helps with an encoder the build lacks,
+                # and nothing suggests a different codec would fix an unknown failure
+                if category == 'codec':
+                    next_settings = self.fallback_codec(current, tried_codecs)
+                else:
+                    next_settings = self.fallback_backend(current)
+                if next_settings is None:
+                    break
+                tried_codecs.add(next_settings.get('codec'))
+                changes = [f"{key} → {value}" for key, value in next_settings.items() if current.get(key) != value]
+                log(f"{category.capitalize()} failure, falling back: {', '.join(changes)}")
+            current = next_settings
+
+        return False, message, category, current
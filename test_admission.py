@@ -0,0 +1,78 @@
+import threading
+
+import pytest
+
+import admission
+from admission import AdmissionController
+
+MB = 2 ** 20
+
+class Host:
+    """Stands in for the live memory and disk figures"""
+    def __init__(self, memory, disk):
+        self.memory = memory
+        self.disk = disk
+
+@pytest.fixture
+def host(monkeypatch):
+    host = Host(memory=4000 * MB, disk=10000 * MB)
+    monkeypatch.setattr(admission, 'get_available_memory', lambda: host.memory)
+    monkeypatch.setattr(admission, 'get_load_per_cpu', lambda: None)
+    monkeypatch.setattr(AdmissionController, 'get_free_disk', lambda self: host.disk)
+    return host
+
+def make_controller():
+    return AdmissionController('/', memory_headroom=0, disk_reserve=0, poll_interval=0.01)
+
+def job(memory, disk=0):
+    return {'memory': memory * MB, 'disk': disk * MB}
+
+def test_first_job_is_always_admitted(host):
+    controller = make_controller()
+    controller.admit(job(8000))
+    assert controller.running == 1
+
+def test_reservation_counts_until_usage_shows_up(host):
+    controller = make_controller()
+    controller.admit(job(1500, 4000))
+
+    # Nothing used yet: the reservation is all that holds the space
+    assert controller.check(job(3000)) is not None
+    assert controller.check(job(2000, 7000)) is not None
+    assert controller.check(job(2000, 5000)) is None
+
+    # Once the job's usage is visible in the live figures it isn't subtracted again
+    host.memory -= 1500 * MB
+    host.disk -= 4000 * MB
+    assert controller.check(job(2500, 6000)) is None
+    assert controller.check(job(2600)) is not None
+
+def test_partly_visible_usage(host):
+    controller = make_controller()
+    controller.admit(job(2000))
+    host.memory -= 500 * MB
+
+    # 3500 MB free, 1500 MB of the reservation not yet in use
+    assert controller.check(job(2000)) is None
+    assert controller.check(job(2100)) is not None
+
+def test_admit_waits_for_release(host):
+    controller = make_controller()
+    first = job(3000)
+    controller.admit(first)
+    host.memory -= 3000 * MB
+    admitted = threading.Event()
+
+    def admit_second():
+        controller.admit(job(2000))
+        admitted.set()
+
+    thread = threading.Thread(target=admit_second)
+    thread.start()
+    assert not admitted.wait(0.1)
+
+    host.memory += 3000 * MB
+    controller.release(first)
+    assert admitted.wait(5)
+    thread.join()
+    assert controller.running == 1
@@ -0,0 +1,114 @@
+import asyncio
+import os
+import stat
+import sys
+
+import pytest
+
+import async_converter
+import ffmpeg_backend
+import verify
+from async_converter import AsyncConverter
+
+SETTINGS = {'format': '.mp4', 'codec': 'libx264', 'resolution': None, 'bitrate': '1000k'}
+
+# Stands in for ffmpeg: reports progress, then writes the output (its last argument)
+FAKE_FFMPEG = """#!{python}
+import os, sys, time
+mode = os.environ.get('FAKE_FFMPEG_MODE', 'ok')
+if mode == 'fail':
+    sys.stderr.write('Unknown encoder libfoo')
+    sys.exit(1)
+for second in range(1, 6):
+    print(f'out_time_us={{second * 1000000}}', flush=True)
+    time.sleep(1 if mode == 'slow' else 0)
+with open(sys.argv[-1], 'w') as f:
+    f.write('video')
+print('progress=end', flush=True)
+"""
+
+@pytest.fixture
+def converter(tmp_path, monkeypatch):
+    ffmpeg = tmp_path / 'ffmpeg'
+    ffmpeg.write_text(FAKE_FFMPEG.format(python=sys.executable))
+    ffmpeg.chmod(ffmpeg.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setattr(ffmpeg_backend, 'get_ffmpeg_binary', lambda: str(ffmpeg))
+
+    def probe_video(input_path):
+        if 'bad' in input_path:
+            raise OSError(f"{input_path}: No such file or directory")
+        return {'duration': 5.0}
+
+    monkeypatch.setattr(async_converter, 'probe_video', probe_video)
+    return AsyncConverter(scratch_dir=str(tmp_path / 'scratch'))
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+def test_convert_reports_progress_and_moves_output(converter, tmp_path):
+    progress = []
+    output_path = str(tmp_path / 'out.mp4')
+
+    success, message = run(converter.convert('in.mov', output_path, SETTINGS, progress.append))
+
+    assert success, message
+    assert progress == [20, 40, 60, 80, 100]
+    assert open(output_path).read() == 'video'
+    assert os.listdir(tmp_path / 'scratch') == []
+
+def test_probe_failure_is_reported(converter, tmp_path):
+    success, message = run(converter.convert('bad.mov', str(tmp_path / 'out.mp4'), SETTINGS))
+
+    assert not success
+    assert 'No such file or directory' in message
+
+def test_batch_continues_after_a_bad_file(converter, tmp_path):
+    successful, failed = run(converter.convert_batch(['bad.mov', 'good.mov'], str(tmp_path), SETTINGS))
+
+    assert successful == 1
+    assert [path for path, message in failed] == ['bad.mov']
+    assert os.path.exists(tmp_path / 'good.mp4')
+
+def test_ffmpeg_failure_removes_partial_output(converter, tmp_path, monkeypatch):
+    monkeypatch.setenv('FAKE_FFMPEG_MODE', 'fail')
+
+    success, message = run(converter.convert('in.mov', str(tmp_path / 'out.mp4'), SETTINGS))
+
+    assert not success
+    assert 'Unknown encoder libfoo' in message
+    assert os.listdir(tmp_path / 'scratch') == []
+
+@pytest.mark.parametrize('result', [(False, 'Low quality', {}), OSError('I/O error')])
+def test_verification_failure_removes_partial_output(converter, tmp_path, monkeypatch, result):
+    def verify_output(*args):
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    monkeypatch.setattr(verify, 'verify_output', verify_output)
+    output_path = str(tmp_path / 'out.mp4')
+
+    success, message = run(converter.convert('in.mov', output_path, dict(SETTINGS, verify=True)))
+
+    assert not success
+    assert not os.path.exists(output_path)
+    assert os.listdir(tmp_path / 'scratch') == []
+
+def test_cancel_stops_ffmpeg_and_removes_partial_output(converter, tmp_path, monkeypatch):
+    monkeypatch.setenv('FAKE_FFMPEG_MODE', 'slow')
+    output_path = str(tmp_path / 'out.mp4')
+
+    async def convert_and_cancel():
+        started = asyncio.Event()
+        task = asyncio.ensure_future(
+            converter.convert('in.mov', output_path, SETTINGS, lambda percentage: started.set())
+        )
+        await asyncio.wait_for(started.wait(), 10)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    run(convert_and_cancel())
+
+    assert not os.path.exists(output_path)
+    assert os.listdir(tmp_path / 'scratch') == []
@@ -0,0 +1,127 @@
+import os
+import sys
+import threading
+import time
+import types
+
+import pytest
+
+from distributed import JobBroker, Worker
+
+SETTINGS = {'format': '.mp4', 'codec': 'libx264', 'resolution': (1280, 720), 'bitrate': '1000k'}
+
+class FakeSignal:
+    def connect(self, slot):
+        pass
+
+def install_converter(monkeypatch, convert):
+    """Replace the converter module Worker.run_job imports with one calling convert(job args)"""
+    class FakeVideoConverter:
+        def __init__(self):
+            self.progress_update = FakeSignal()
+
+        def convert_with_settings(self, input_path, output_path, settings):
+            return convert(input_path, output_path, settings)
+
+    module = types.ModuleType('converter')
+    module.VideoConverter = FakeVideoConverter
+    monkeypatch.setitem(sys.modules, 'converter', module)
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'jobs.sqlite3')
+
+def test_two_workers_run_each_job_once(db_path, tmp_path, monkeypatch):
+    broker = JobBroker(db_path)
+    broker.submit_batch([f"/videos/clip{i}.mov" for i in range(20)], str(tmp_path / 'out'), SETTINGS)
+    converted = []
+    lock = threading.Lock()
+
+    def convert(input_path, output_path, settings):
+        assert settings == SETTINGS
+        time.sleep(0.01)
+        with lock:
+            converted.append(input_path)
+        with open(output_path, 'w') as f:
+            f.write(input_path)
+        return True, "Conversion successful!"
+
+    install_converter(monkeypatch, convert)
+    workers = [Worker(JobBroker(db_path), f"worker-{i}", poll_interval=0.01) for i in range(2)]
+    threads = [threading.Thread(target=worker.run, kwargs={'exit_when_idle': True}) for worker in workers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=30)
+
+    assert sorted(converted) == sorted(f"/videos/clip{i}.mov" for i in range(20))
+    assert broker.status() == {'done': 20}
+    assert sorted(os.listdir(tmp_path / 'out')) == sorted(f"clip{i}.mp4" for i in range(20))
+
+def test_claim_is_exclusive(db_path):
+    broker = JobBroker(db_path)
+    job_id = broker.submit('/videos/a.mov', '/out/a.mp4', SETTINGS)
+
+    job = broker.claim('worker-a')
+    assert job['id'] == job_id and job['attempts'] == 1
+    assert broker.claim('worker-b') is None
+
+def test_stale_job_is_requeued_to_another_worker(db_path):
+    broker = JobBroker(db_path, job_timeout=0.05)
+    job_id = broker.submit('/videos/a.mov', '/out/a.mp4', SETTINGS)
+    broker.claim('worker-a')
+
+    assert broker.requeue_stale() == 0
+    time.sleep(0.1)
+    assert broker.requeue_stale() == 1
+
+    job = broker.claim('worker-b')
+    assert job['id'] == job_id and job['attempts'] == 2
+    # The first worker has lost its lease and can't report over the new one
+    assert not broker.heartbeat(job_id, 'worker-a')
+    assert not broker.complete(job_id, 'worker-a', True, "late result")
+    assert broker.complete(job_id, 'worker-b', True, "Conversion successful!")
+    assert broker.results() == [('/videos/a.mov', 'done', "Conversion successful!")]
+
+def test_job_fails_after_max_attempts(db_path):
+    broker = JobBroker(db_path, job_timeout=0.05, max_attempts=2)
+    job_id = broker.submit('/videos/a.mov', '/out/a.mp4', SETTINGS)
+
+    broker.claim('worker-a')
+    time.sleep(0.1)
+    assert broker.requeue_stale() == 1
+    broker.claim('worker-b')
+    time.sleep(0.1)
+    assert broker.requeue_stale() == 0
+
+    assert broker.status() == {'failed': 1}
+    assert not broker.complete(job_id, 'worker-b', True, "late result")
+
+@pytest.mark.parametrize('late_success', [True, False])
+def test_worker_discards_result_after_losing_lease(db_path, tmp_path, monkeypatch, late_success):
+    broker = JobBroker(db_path, job_timeout=0.05)
+    final_path = str(tmp_path / 'a.mp4')
+    job_id = broker.submit('/videos/a.mov', final_path, SETTINGS)
+
+    def convert(input_path, output_path, settings):
+        assert output_path != final_path
+        # Stall past the timeout so another worker takes over and finishes the job
+        time.sleep(0.1)
+        assert broker.requeue_stale() == 1
+        assert broker.claim('worker-b')['id'] == job_id
+        with open(final_path, 'w') as f:
+            f.write("worker-b")
+        broker.complete(job_id, 'worker-b', True, "converted by worker-b")
+        with open(output_path, 'w') as f:
+            f.write("worker-a")
+        return late_success, "late result"
+
+    install_converter(monkeypatch, convert)
+    worker = Worker(JobBroker(db_path), 'worker-a', heartbeat_interval=60, poll_interval=0.01)
+    worker.run(exit_when_idle=True)
+
+    assert broker.results() == [('/videos/a.mov', 'done', "converted by worker-b")]
+    # The stale worker's encode is dropped, not moved over the new owner's output
+    with open(final_path) as f:
+        assert f.read() == "worker-b"
+    assert sorted(os.listdir(tmp_path)) == ['a.mp4', 'jobs.sqlite3']
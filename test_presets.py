@@ -0,0 +1,91 @@
+import json
+
+import pytest
+
+from presets import (CONVERSION_PRESETS, PresetError, PresetStore, compile_preset, parse_resolution)
+
+VALID = {'format': '.mp4', 'codec': 'libx264', 'resolution': '1280x720', 'bitrate': '1000k'}
+
+def test_builtin_presets_are_valid():
+    store = PresetStore()
+    assert store.load_builtin() == len(CONVERSION_PRESETS)
+    assert store.errors == []
+
+def test_compile_preset_normalizes_values():
+    preset = compile_preset('Web', dict(VALID, fps=30, start=1.5, end=10))
+    assert preset.resolution == (1280, 720)
+    assert preset.resolution_label is not None
+    assert (preset.fps, preset.start, preset.end) == (30, 1.5, 10)
+    assert preset.pixel_format == 'auto'
+
+@pytest.mark.parametrize('changes', [
+    {'format': '.xyz'},
+    {'codec': 'libfoo'},
+    {'format': '.webm', 'codec': 'libx264'},
+    {'bitrate': '1000'},
+    {'bitrate': 1000},
+    {'resolution': '1281x720'},
+    {'resolution': [1280]},
+    {'fps': 0},
+    {'fps': True},
+    {'start': float('nan')},
+    {'end': float('inf')},
+    {'duration': float('nan')},
+    {'start': -1},
+    {'start': 5, 'end': 2},
+    {'end': 10, 'duration': 5},
+    {'duration': 0},
+    {'pixel_format': 'yuv 420'},
+    {'unknown': 1},
+])
+def test_compile_preset_rejects_invalid_values(changes):
+    with pytest.raises(PresetError):
+        compile_preset('Bad', dict(VALID, **changes))
+
+def test_webm_accepts_vp9():
+    assert compile_preset('WebM', dict(VALID, format='.webm', codec='libvpx-vp9')).codec == 'libvpx-vp9'
+
+def test_parse_resolution():
+    assert parse_resolution(None) is None
+    assert parse_resolution('original') is None
+    assert parse_resolution([640, 360]) == (640, 360)
+
+def test_presets_are_immutable():
+    preset = compile_preset('Web', VALID)
+    with pytest.raises(AttributeError):
+        preset.codec = 'libx265'
+    with pytest.raises(AttributeError):
+        del preset.codec
+    assert preset.codec == 'libx264'
+
+def test_store_indexes_by_name_and_settings(tmp_path):
+    user_presets = {
+        'Web Optimized (MP4)': dict(VALID, bitrate='1200k'),
+        'Small': dict(VALID, resolution='640x360', bitrate='400k'),
+        'Broken': dict(VALID, format='.webm'),
+    }
+    (tmp_path / 'mine.json').write_text(json.dumps({'presets': user_presets}))
+    (tmp_path / 'notes.txt').write_text("ignored")
+
+    store = PresetStore()
+    store.load_builtin()
+    assert store.load_directory(str(tmp_path)) == 2
+
+    assert len(store.errors) == 1 and 'Broken' in store.errors[0]
+    with pytest.raises(PresetError):
+        store.check()
+
+    # The user file overrides the built-in preset of the same name, in both indexes
+    assert store.get('Web Optimized (MP4)').bitrate == '1200k'
+    assert store.find({'format': '.mp4', 'codec': 'libx264', 'resolution': (1280, 720),
+                       'bitrate': '1000k'}) == []
+    assert [preset.name for preset in store.find({'format': '.mp4', 'codec': 'libx264',
+                                                  'resolution': (640, 360), 'bitrate': '400k'})] == ['Small']
+    assert 'Small' in store.names()
+
+def test_store_records_unreadable_files(tmp_path):
+    (tmp_path / 'bad.json').write_text("{not json")
+
+    store = PresetStore()
+    assert store.load_directory(str(tmp_path)) == 0
+    assert len(store.errors) == 1
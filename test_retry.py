@@ -0,0 +1,89 @@
+from retry import classify_failure, RetryPolicy
+
+MOVIEPY_CODEC_ERROR = (
+    "[Errno 32] Broken pipe\n\nMoviePy error: FFMPEG encountered the following error while "
+    "writing file out.mp4:\n\n b\"Unknown encoder 'libx265'\""
+)
+
+def make_convert(results):
+    calls = []
+
+    def convert(settings):
+        calls.append(settings)
+        return results[min(len(calls), len(results)) - 1]
+
+    return convert, calls
+
+def test_classify_failure():
+    assert classify_failure("No space left on device") == 'transient'
+    assert classify_failure("[Errno 32] Broken pipe") == 'transient'
+    assert classify_failure("Unknown encoder 'libx265'") == 'codec'
+    assert classify_failure("in.mov: Invalid data found when processing input") == 'input'
+    assert classify_failure("Conversion failed: Trim end must be after the start") == 'settings'
+    assert classify_failure("Conversion failed: Verification failed: Low quality: PSNR 25.0 dB, SSIM 0.700") \
+        == 'verification'
+    assert classify_failure("something odd happened") == 'unknown'
+
+def test_moviepy_encoder_error_is_codec_failure():
+    assert classify_failure(MOVIEPY_CODEC_ERROR) == 'codec'
+
+def test_codec_failure_falls_back_without_sleeping():
+    sleeps = []
+    convert, calls = make_convert([(False, MOVIEPY_CODEC_ERROR), (True, "done")])
+    settings = {'format': '.mp4', 'codec': 'libx265', 'backend': 'moviepy'}
+
+    success, message, category, used = RetryPolicy(sleep=sleeps.append).run(convert, settings)
+
+    assert success and category is None
+    assert [call['codec'] for call in calls] == ['libx265', 'libx264']
+    assert used['codec'] == 'libx264'
+    assert sleeps == []
+
+def test_transient_failure_retries_with_backoff():
+    sleeps = []
+    convert, calls = make_convert([(False, "No space left on device")] * 2 + [(True, "done")])
+    settings = {'format': '.mp4', 'codec': 'libx264', 'backend': 'native'}
+
+    success, _, _, used = RetryPolicy(backoff=2, backoff_factor=2, sleep=sleeps.append).run(convert, settings)
+
+    assert success
+    assert sleeps == [2, 4]
+    assert all(call == settings for call in calls)
+
+def test_unknown_failure_switches_backend_first():
+    convert, calls = make_convert([(False, "something odd happened"), (True, "done")])
+    settings = {'format': '.mp4', 'codec': 'libx264', 'backend': 'native'}
+
+    success, _, _, used = RetryPolicy(sleep=lambda delay: None).run(convert, settings)
+
+    assert success
+    assert used == dict(settings, backend='moviepy')
+
+def test_input_failure_is_not_retried():
+    convert, calls = make_convert([(False, "No such file or directory")])
+
+    success, _, category, _ = RetryPolicy(sleep=lambda delay: None).run(convert, {'codec': 'libx264'})
+
+    assert not success and category == 'input'
+    assert len(calls) == 1
+
+def test_unknown_failure_never_changes_codec():
+    convert, calls = make_convert([(False, "something odd happened")])
+    settings = {'format': '.mp4', 'codec': 'libx265', 'backend': 'auto'}
+
+    success, _, category, used = RetryPolicy(sleep=lambda delay: None).run(convert, settings)
+
+    assert not success and category == 'unknown'
+    assert [(call['backend'], call['codec']) for call in calls] == [('auto', 'libx265'), ('moviepy', 'libx265')]
+    assert used['codec'] == 'libx265'
+
+def test_verification_and_settings_failures_are_not_retried():
+    for message in ("Conversion failed: Verification failed: Low quality: PSNR 25.0 dB, SSIM 0.700",
+                    "Conversion failed: Trim end must be after the start"):
+        convert, calls = make_convert([(False, message)])
+        settings = {'format': '.mp4', 'codec': 'libx264', 'backend': 'auto'}
+
+        success, _, category, used = RetryPolicy(sleep=lambda delay: None).run(convert, settings)
+
+        assert not success and category in ('verification', 'settings')
+        assert len(calls) == 1 and used == settings
@@ -0,0 +1,82 @@
+import errno
+import os
+
+import pytest
+
+import utils
+from utils import atomic_move, get_trim_range, ReadAhead
+
+def test_atomic_move_renames_within_a_filesystem(tmp_path):
+    src = tmp_path / 'scratch.mp4'
+    dst = tmp_path / 'out' / 'video.mp4'
+    dst.parent.mkdir()
+    src.write_bytes(b'video')
+
+    atomic_move(str(src), str(dst))
+
+    assert dst.read_bytes() == b'video'
+    assert not src.exists()
+
+def test_atomic_move_copies_across_filesystems(tmp_path, monkeypatch):
+    src = tmp_path / 'scratch.mp4'
+    dst = tmp_path / 'video.mp4'
+    src.write_bytes(b'video' * 1000)
+    dst.write_bytes(b'old')
+    real_replace = os.replace
+
+    def replace(source, target):
+        # Only the final rename of the copy, made next to dst, may succeed
+        if source == str(src):
+            raise OSError(errno.EXDEV, "Invalid cross-device link")
+        real_replace(source, target)
+
+    monkeypatch.setattr(utils.os, 'replace', replace)
+    atomic_move(str(src), str(dst))
+
+    assert dst.read_bytes() == b'video' * 1000
+    assert not src.exists()
+    assert os.listdir(tmp_path) == ['video.mp4']
+
+def test_atomic_move_cleans_up_failed_copy(tmp_path, monkeypatch):
+    src = tmp_path / 'scratch.mp4'
+    dst = tmp_path / 'video.mp4'
+    src.write_bytes(b'video')
+
+    def replace(source, target):
+        raise OSError(errno.EXDEV if source == str(src) else errno.ENOSPC, "failed")
+
+    monkeypatch.setattr(utils.os, 'replace', replace)
+    with pytest.raises(OSError):
+        atomic_move(str(src), str(dst))
+
+    assert src.exists()
+    assert os.listdir(tmp_path) == ['scratch.mp4']
+
+def test_get_trim_range():
+    assert get_trim_range() == (0.0, None)
+    assert get_trim_range(2.0, end=5.0) == (2.0, 3.0)
+    assert get_trim_range(2.0, duration=4.0) == (2.0, 4.0)
+    with pytest.raises(ValueError):
+        get_trim_range(5.0, end=2.0)
+
+@pytest.mark.skipif(not hasattr(os, 'posix_fadvise'), reason="posix_fadvise not available")
+def test_readahead_window_follows_trim_range(tmp_path, monkeypatch):
+    source = tmp_path / 'source.mov'
+    source.write_bytes(b'\0' * 1000)
+    requests = []
+    monkeypatch.setattr(utils.os, 'posix_fadvise', lambda fd, offset, length, advice: requests.append((offset, length)))
+
+    reader = ReadAhead(str(source), 100, start_fraction=0.5, end_fraction=0.9)
+    assert requests == [(500, 100)]
+    reader.advance(0.05)
+    assert requests == [(500, 100)]
+    reader.advance(0.15)
+    assert requests[-1] == (600, 100)
+    # Decoding overtook the requested range: the window restarts at the decoder
+    reader.advance(0.6)
+    assert requests[-1] == (740, 100)
+    reader.advance(1.0)
+    reader.close()
+
+    assert len(requests) == 3
+    assert all(500 <= offset and offset + length <= 900 for offset, length in requests)
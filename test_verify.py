@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+import verify
+from verify import psnr, ssim, parse_stream_durations, get_expected_durations
+
+SOURCE = {'duration': 10.8, 'fps': 25.0, 'has_audio': True}
+
+def gradient(height=64, width=64):
+    return np.add.outer(np.arange(height), np.arange(width)).astype(np.float32) * 2
+
+def test_psnr():
+    frame = gradient()
+    assert psnr(frame, frame) == 100.0
+    # Uniform error of 5: MSE 25
+    assert psnr(frame, frame + 5) == pytest.approx(10 * np.log10(255 ** 2 / 25))
+    assert psnr(frame, frame + 20) < psnr(frame, frame + 5)
+
+def test_ssim():
+    frame = gradient()
+    assert ssim(frame, frame) == pytest.approx(1.0)
+    noise = np.random.default_rng(0).normal(0, 25, frame.shape).astype(np.float32)
+    assert ssim(frame, frame + noise) < 0.9
+    assert ssim(frame, frame + noise) < ssim(frame, frame + noise / 5)
+    # Partial blocks at the edges are ignored
+    assert ssim(frame[:61, :63], frame[:61, :63]) == pytest.approx(1.0)
+
+def test_parse_stream_durations():
+    lines = [
+        "#tb 0: 1/12800",
+        "#tb 1: 1/44100",
+        "#media_type 0: video",
+        "0,      -1024,          0,      512,     1234, 0x00000000",
+        "1,          0,          0,     1024,      100, 0x00000000",
+        "0,       -512,      50688,      512,     1234, 0x00000000",
+        "1,     219476,     219476,     1024,      100, 0x00000000",
+    ]
+    durations = parse_stream_durations(lines)
+    assert durations[0] == pytest.approx(4.0)
+    assert durations[1] == pytest.approx(220500 / 44100)
+
+@pytest.fixture
+def stream_probes(monkeypatch):
+    calls = []
+
+    def probe_stream_durations(path):
+        calls.append('metadata')
+        return {'video': 10.0, 'audio': None}
+
+    def get_stream_durations(path):
+        calls.append('demux')
+        return 10.0, 10.8, ''
+
+    monkeypatch.setattr(verify, 'probe_stream_durations', probe_stream_durations)
+    monkeypatch.setattr(verify, 'get_stream_durations', get_stream_durations)
+    return calls
+
+def test_expected_durations_measure_streams_separately(stream_probes):
+    assert get_expected_durations('in.mov', {}, SOURCE) == (10.0, 10.8)
+    assert stream_probes == ['metadata', 'demux']
+
+def test_expected_durations_of_open_ended_trim(stream_probes):
+    video, audio = get_expected_durations('in.mov', {'start': 2.0}, SOURCE)
+    assert (video, audio) == (pytest.approx(8.0), pytest.approx(8.8))
+
+def test_bounded_trim_skips_source_scan(stream_probes):
+    assert get_expected_durations('in.mov', {'start': 2.0, 'duration': 5.0}, SOURCE) == (5.0, 5.0)
+    assert get_expected_durations('in.mov', {'start': 1.0, 'end': 3.0}, SOURCE) == (2.0, 2.0)
+    assert stream_probes == []
@@ -1,4 +1,7 @@
+import errno
 import os
+import shutil
+import uuid
 
 def get_file_extension(filepath):
     return os.path.splitext(filepath)[1].lower()
@@ -10,3 +13,111 @@ def get_output_filepath(input_filepath, output_dir, output_format):
     filename = os.path.splitext(os.path.basename(input_filepath))[0]
     return os.path.join(output_dir, f"{filename}{output_format}")
 
+def get_scratch_filepath(output_path, scratch_dir=None):
+    """Return a unique in-progress path for output_path, keeping its extension for ffmpeg"""
+    directory = scratch_dir or os.path.dirname(os.path.abspath(output_path))
+    os.makedirs(directory, exist_ok=True)
+    name, ext = os.path.splitext(os.path.basename(output_path))
+    return os.path.join(directory, f".{name}.{uuid.uuid4().hex[:8]}.partial{ext}")
+
+def fsync_directory(directory):
+    """Flush a directory entry to disk (no-op where directories can't be opened)"""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def atomic_move(src, dst):
+    """
+    Move a finished file into place so dst is never seen half-written.
+    Within a filesystem this is a rename; across filesystems the file is
+    copied to a temporary name next to dst, fsynced, then renamed.
+    """
+    try:
+        os.replace(src, dst)
+        return
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+
+    tmp_path = get_scratch_filepath(dst)
+    try:
+        with open(src, 'rb') as fsrc, open(tmp_path, 'wb') as fdst:
+            shutil.copyfileobj(fsrc, fdst, 16 * 1024 * 1024)
+            fdst.flush()
+            os.fsync(fdst.fileno())
+        shutil.copystat(src, tmp_path)
+        os.replace(tmp_path, dst)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    fsync_directory(os.path.dirname(os.path.abspath(dst)))
+    os.remove(src)
+
+class ReadAhead:
+    """
+    Keeps a window of a large source file ahead of the decoder in the page
+    cache. The window starts at the byte offset of the trim start (estimated
+    assuming a constant bitrate) and moves forward as advance() reports
+    progress, so memory holds only the part about to be decoded.
+    """
+
+    def __init__(self, filepath, window, start_fraction=0.0, end_fraction=1.0):
+        self.fd = None
+        self.window = window
+        size = os.path.getsize(filepath)
+        self.start = int(size * start_fraction)
+        self.end = min(size, int(size * end_fraction))
+        self.requested = self.start
+        if hasattr(os, 'posix_fadvise'):
+            try:
+                self.fd = os.open(filepath, os.O_RDONLY)
+            except OSError:
+                return
+            self.advance(0.0)
+
+    def advance(self, fraction):
+        """Report how far through the range decoding is (0-1); requests the next window when due"""
+        if self.fd is None or self.requested >= self.end:
+            return
+        position = self.start + int((self.end - self.start) * fraction)
+        # Ask for the next window once decoding is within half a window of what was requested
+        if position + self.window // 2 < self.requested:
+            return
+        offset = max(self.requested, position)
+        if offset >= self.end:
+            self.requested = self.end
+            return
+        length = min(self.window, self.end - offset)
+        try:
+            os.posix_fadvise(self.fd, offset, length, os.POSIX_FADV_WILLNEED)
+        except OSError:
+            self.close()
+            return
+        self.requested = offset + length
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+def get_trim_range(start=None, end=None, duration=None):
+    """
+    Return (start, length) in seconds for the trim options of a settings dict.
+    length is None when the clip runs to the end of the source; end wins over duration.
+    """
+    start = start or 0.0
+    if end is not None:
+        length = end - start
+    else:
+        length = duration
+    if length is not None and length <= 0:
+        raise ValueError("Trim end must be after the start")
+    return start, length
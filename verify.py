@@ -0,0 +1,191 @@
+import subprocess
+import tempfile
+import numpy as np
+
+from config import (VERIFY_DURATION_TOLERANCE, VERIFY_AV_SYNC_TOLERANCE, VERIFY_SAMPLE_FRAMES,
+                    VERIFY_SAMPLE_WIDTH, VERIFY_MIN_PSNR, VERIFY_MIN_SSIM)
+from analysis import read_gray_frames
+from ffmpeg_backend import get_ffmpeg_binary, probe_video, probe_stream_durations, get_output_duration
+from utils import get_trim_range
+
+def parse_stream_durations(lines):
+    """Return {stream index: seconds} from ffmpeg framecrc output, first packet to end of last"""
+    timebases = {}
+    first = {}
+    last = {}
+    for line in lines:
+        if line.startswith('#tb '):
+            index, _, timebase = line[4:].partition(':')
+            numerator, _, denominator = timebase.strip().partition('/')
+            timebases[int(index)] = int(numerator) / int(denominator)
+        elif line.strip() and not line.startswith('#'):
+            fields = line.split(',')
+            try:
+                index, pts, duration = int(fields[0]), int(fields[2]), int(fields[3])
+            except (IndexError, ValueError):
+                continue
+            first[index] = min(first.get(index, pts), pts)
+            last[index] = max(last.get(index, pts + duration), pts + duration)
+    return {index: (last[index] - first[index]) * timebases.get(index, 0) for index in last}
+
+def get_stream_durations(path):
+    """
+    Return (video duration, audio duration, errors) by demuxing the first
+    video and audio stream once with stream copy, which reads packets
+    without decoding them. A missing stream's duration is None.
+    """
+    cmd = [
+        get_ffmpeg_binary(), '-hide_banner', '-v', 'error', '-i', path,
+        '-map', '0:v:0', '-map', '0:a:0?', '-c', 'copy', '-f', 'framecrc', '-'
+    ]
+    # One line per packet: parse as it streams, and keep stderr off a pipe
+    # that could fill up while stdout is being read
+    with tempfile.TemporaryFile() as stderr:
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr, universal_newlines=True)
+        durations = parse_stream_durations(process.stdout)
+        process.wait()
+        stderr.seek(0)
+        errors = stderr.read().decode('utf-8', 'replace').strip()
+    if process.returncode != 0 and not errors:
+        errors = f"ffmpeg exited with code {process.returncode}"
+    return durations.get(0), durations.get(1), errors
+
+def check_tail_decodes(path):
+    """Decode the last second of the output; truncated files fail here. Returns error text."""
+    cmd = [get_ffmpeg_binary(), '-hide_banner', '-v', 'error', '-sseof', '-1', '-i', path, '-f', 'null', '-']
+    result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True)
+    if result.returncode != 0:
+        return result.stderr.strip() or f"ffmpeg exited with code {result.returncode}"
+    return result.stderr.strip()
+
+def psnr(reference, distorted):
+    mse = np.mean((reference - distorted) ** 2)
+    if mse == 0:
+        return 100.0
+    return float(10 * np.log10(255.0 ** 2 / mse))
+
+def ssim(reference, distorted, block=8):
+    """Mean SSIM over non-overlapping blocks, vectorized over all blocks at once"""
+    height = (reference.shape[0] // block) * block
+    width = (reference.shape[1] // block) * block
+    shape = (height // block, block, width // block, block)
+    a = reference[:height, :width].reshape(shape)
+    b = distorted[:height, :width].reshape(shape)
+
+    mean_a = a.mean(axis=(1, 3), keepdims=True)
+    mean_b = b.mean(axis=(1, 3), keepdims=True)
+    var_a = ((a - mean_a) ** 2).mean(axis=(1, 3))
+    var_b = ((b - mean_b) ** 2).mean(axis=(1, 3))
+    covariance = ((a - mean_a) * (b - mean_b)).mean(axis=(1, 3))
+    mean_a = mean_a[:, 0, :, 0]
+    mean_b = mean_b[:, 0, :, 0]
+
+    c1 = (0.01 * 255) ** 2
+    c2 = (0.03 * 255) ** 2
+    ssim_map = (((2 * mean_a * mean_b + c1) * (2 * covariance + c2))
+                / ((mean_a ** 2 + mean_b ** 2 + c1) * (var_a + var_b + c2)))
+    return float(ssim_map.mean())
+
+def get_expected_durations(input_path, settings, source):
+    """
+    Return the (video, audio) durations the output should have; audio is
+    None for sources without audio. Streams of one file often differ in
+    length, so they are measured separately rather than taken from the
+    container duration, which is that of the longest stream.
+    """
+    has_audio = source['has_audio']
+    start, length = get_trim_range(settings.get('start'), settings.get('end'), settings.get('duration'))
+    bounded = length is not None and start + length <= source['duration']
+    if settings.get('backend') == 'moviepy' or bounded:
+        # MoviePy writes both streams for the clip's (container) duration, and a
+        # trim that ends inside the source bounds both streams, so no need to
+        # read the whole source to measure them
+        expected = get_output_duration(settings, source['duration'])
+        return expected, expected if has_audio else None
+
+    durations = probe_stream_durations(input_path)
+    if durations['video'] is None or (has_audio and durations['audio'] is None):
+        # Not in the metadata: measure both streams in one demux pass
+        durations['video'], durations['audio'], _ = get_stream_durations(input_path)
+    video_duration = get_output_duration(settings, durations['video'] or source['duration'])
+    audio_duration = None
+    if has_audio:
+        audio_duration = get_output_duration(settings, durations['audio'] or source['duration'])
+    return video_duration, audio_duration
+
+def measure_quality(input_path, output_path, settings, output_duration,
+                    samples=VERIFY_SAMPLE_FRAMES, width=VERIFY_SAMPLE_WIDTH):
+    """Compare a few matching frames of source and output; returns (psnr, ssim) averages"""
+    output_size = probe_video(output_path)['size']
+    height = max(2, int(round(width * output_size[1] / output_size[0] / 2)) * 2)
+    trim_start = get_trim_range(settings.get('start'), settings.get('end'), settings.get('duration'))[0]
+
+    psnr_values = []
+    ssim_values = []
+    for i in range(samples):
+        timestamp = output_duration * (i + 0.5) / samples
+        try:
+            reference = read_gray_frames(input_path, trim_start + timestamp, 1, (width, height))
+            distorted = read_gray_frames(output_path, timestamp, 1, (width, height))
+        except RuntimeError:
+            continue
+        if len(reference) == 0 or len(distorted) == 0:
+            continue
+        psnr_values.append(psnr(reference[0], distorted[0]))
+        ssim_values.append(ssim(reference[0], distorted[0]))
+
+    if not psnr_values:
+        return None, None
+    return float(np.mean(psnr_values)), float(np.mean(ssim_values))
+
+def verify_output(input_path, output_path, settings, check_quality=False):
+    """
+    Check a finished encode: container readable and not truncated, duration
+    matching the source's video stream (or trim range), the audio/video
+    length difference matching the source's, and optionally sampled PSNR/SSIM against the source.
+    Returns (success, message, report).
+    """
+    source = probe_video(input_path)
+    expected, expected_audio = get_expected_durations(input_path, settings, source)
+    report = {'expected_duration': expected, 'expected_audio_duration': expected_audio}
+
+    video_duration, audio_duration, errors = get_stream_durations(output_path)
+    report['video_duration'] = video_duration
+    if video_duration is None:
+        return False, f"No readable video stream: {errors or 'unknown error'}", report
+    if errors:
+        return False, f"Container errors: {errors.splitlines()[0]}", report
+
+    tail_errors = check_tail_decodes(output_path)
+    if tail_errors:
+        return False, f"Output does not decode to the end: {tail_errors.splitlines()[0]}", report
+
+    fps = settings.get('fps') or source['fps'] or 30
+    tolerance = max(VERIFY_DURATION_TOLERANCE, 2.0 / fps)
+    if abs(video_duration - expected) > tolerance:
+        return False, f"Duration {video_duration:.2f}s, expected {expected:.2f}s", report
+
+    if expected_audio is not None:
+        report['audio_duration'] = audio_duration
+        if audio_duration is None:
+            return False, "Audio stream missing from output", report
+        # Compare against the source's own offset; many sources have audio
+        # running past the last video frame
+        drift = (audio_duration - video_duration) - (expected_audio - expected)
+        if abs(drift) > VERIFY_AV_SYNC_TOLERANCE:
+            return False, (f"Audio/video length mismatch: audio {audio_duration:.2f}s, "
+                           f"video {video_duration:.2f}s, expected audio {expected_audio:.2f}s"), report
+
+    if check_quality:
+        psnr_value, ssim_value = measure_quality(input_path, output_path, settings, video_duration)
+        report['psnr'] = psnr_value
+        report['ssim'] = ssim_value
+        if psnr_value is None:
+            return False, "Could not sample frames for quality check", report
+        if psnr_value < VERIFY_MIN_PSNR or ssim_value < VERIFY_MIN_SSIM:
+            return False, f"Low quality: PSNR {psnr_value:.1f} dB, SSIM {ssim_value:.3f}", report
+
+    message = f"Verified: {video_duration:.2f}s"
+    if check_quality:
+        message += f", PSNR {report['psnr']:.1f} dB, SSIM {report['ssim']:.3f}"
+    return True, message, report